@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the Excel cell classifier (skip patterns + itinerari).
+Compares the original any()/nested-loop checks with the precompiled
+CellClassifier on every string cell of the timetable workbooks.
+"""
+
+import argparse
+import importlib.util
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from openpyxl import load_workbook
+
+from excel_cell_classifier import CellClassifier
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_EXCEL_DIR = REPO_ROOT / "csv" / "excelhorari"
+
+
+def load_extractor():
+    """Import extract-all-excel-schedules-v2.py, whose tables are benchmarked."""
+    path = Path(__file__).resolve().parent / "extract-all-excel-schedules-v2.py"
+    spec = importlib.util.spec_from_file_location("extract_all_excel_schedules_v2", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_corpus(excel_dir: Path) -> List[str]:
+    """Collect every non-empty string cell of the workbooks, stripped."""
+    cells = []
+    for path in sorted(excel_dir.glob("*.xlsx")):
+        if path.name.startswith('~'):
+            continue
+        wb = load_workbook(path, data_only=True, read_only=True)
+        try:
+            for row in wb.active.iter_rows(values_only=True):
+                cells.extend(value.strip() for value in row if isinstance(value, str) and value.strip())
+        finally:
+            wb.close()
+    return cells
+
+
+def legacy_classify(text: str, skip_patterns, itinerari_keywords):
+    """The checks as they were inlined in extract_schedule_data.
+
+    The keyword loop's break only left the inner loop, so the last
+    itinerari that matched was kept.
+    """
+    skip = any(pattern in text for pattern in skip_patterns)
+    itinerari = None
+    text_lower = text.lower()
+    for iti, keywords in itinerari_keywords.items():
+        for keyword in keywords:
+            if keyword in text_lower:
+                itinerari = iti
+                break
+    return skip, itinerari
+
+
+def reference_classify(text: str, skip_patterns, itinerari_keywords):
+    """Same checks with the first matching itinerari kept (the intended behaviour)."""
+    skip = any(pattern in text for pattern in skip_patterns)
+    text_lower = text.lower()
+    for iti, keywords in itinerari_keywords.items():
+        if any(keyword in text_lower for keyword in keywords):
+            return skip, iti
+    return skip, None
+
+
+def measure(classify: Callable[[str], object], cells: List[str], repeat: int,
+            reset: Optional[Callable[[], None]] = None) -> float:
+    """Return classified cells per second over `repeat` passes of the corpus.
+
+    `reset` runs before every pass, e.g. to empty a memo table.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        if reset:
+            reset()
+        for cell in cells:
+            classify(cell)
+    elapsed = time.perf_counter() - start
+    return len(cells) * repeat / elapsed
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Benchmark the Excel cell classifier")
+    parser.add_argument('--excel-dir', default=str(DEFAULT_EXCEL_DIR),
+                        help="Directory with the timetable workbooks used as input")
+    parser.add_argument('--repeat', type=int, default=200,
+                        help="Number of passes over the corpus (default: 200)")
+    args = parser.parse_args()
+
+    cells = load_corpus(Path(args.excel_dir))
+    if not cells:
+        raise SystemExit(f"No string cells found in {args.excel_dir}")
+
+    extractor = load_extractor()
+    skip_patterns = extractor.SKIP_PATTERNS
+    keywords = extractor.ITINERARI_KEYWORDS
+    classifier = CellClassifier(skip_patterns, keywords)
+
+    # The compiled classifier must agree with the first-match reference
+    mismatches = [cell for cell in cells
+                  if classifier.classify(cell) != reference_classify(cell, skip_patterns, keywords)]
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} results differ, e.g. {mismatches[0]!r}")
+    changed = sum(1 for cell in cells
+                  if legacy_classify(cell, skip_patterns, keywords)[1] != classifier.itinerari(cell))
+
+    print(f"Corpus: {len(cells)} cells ({len(set(cells))} unique) x {args.repeat} passes")
+    print(f"Cells whose itinerari changes from last to first match: {changed}")
+
+    before_rate = measure(lambda cell: legacy_classify(cell, skip_patterns, keywords), cells, args.repeat)
+    # Emptying the memo every pass isolates the gain from the single regex
+    compiled_rate = measure(classifier.classify, cells, args.repeat, reset=classifier._memo.clear)
+    after_rate = measure(classifier.classify, cells, args.repeat)
+    print(f"{'before':>14}{'compiled':>14}{'memoised':>14}{'speedup':>10}  (cells/s)")
+    print(f"{before_rate:>14,.0f}{compiled_rate:>14,.0f}{after_rate:>14,.0f}{after_rate / before_rate:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the fuzzy name matching of compare-excel-database.py.
+Compares the brute-force find_best_match() with the trigram-indexed
+FuzzyMatcher on the subject and teacher lookups of the comparison report,
+after checking that both return the same matches.
+"""
+
+import argparse
+import importlib.util
+import json
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from fuzzy_matcher import FuzzyMatcher
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_EXCEL_DATA = REPO_ROOT / "csv" / "extracted_excel_data_fixed.json"
+DEFAULT_DATABASE_DATA = REPO_ROOT / "csv" / "extracted_database_data.json"
+
+
+def load_comparer():
+    """Import compare-excel-database.py, whose matching is benchmarked."""
+    path = Path(__file__).resolve().parent / "compare-excel-database.py"
+    spec = importlib.util.spec_from_file_location("compare_excel_database", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_lookups(excel_file: Path, database_file: Path, scale: int) -> List[Tuple[str, List[str], List[str], float]]:
+    """(label, names, candidates, threshold) of the subject and teacher lookups.
+
+    With scale > 1 every candidate set gets scale - 1 numbered copies of
+    each name ('... 2', '... 3'), close variants that are the hard case for
+    the index, to show how both approaches grow with the candidate set.
+    """
+    with open(excel_file, 'r', encoding='utf-8') as f:
+        excel_data = json.load(f)['data']
+    with open(database_file, 'r', encoding='utf-8') as f:
+        db_data = json.load(f)
+
+    subjects = list(dict.fromkeys(entry['asignatura'] for entry in excel_data))
+    teachers = sorted({entry['profesor'] for entry in excel_data if entry.get('profesor')})
+    db_subjects = [subject['name'] for subject in db_data['subjects']]
+    db_teachers = [f"{t['first_name']} {t['last_name']}" for t in db_data['teachers']]
+
+    def scaled(names):
+        return names + [f"{name} {copy}" for copy in range(2, scale + 1) for name in names]
+
+    return [('subjects', subjects, scaled(db_subjects), 0.8),
+            ('teachers', teachers, scaled(db_teachers), 0.7)]
+
+
+def measure(match: Callable[[str], object], names: List[str], repeat: int) -> float:
+    """Return matched names per second over `repeat` passes."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for name in names:
+            match(name)
+    elapsed = time.perf_counter() - start
+    return len(names) * repeat / elapsed
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Benchmark the fuzzy name matcher")
+    parser.add_argument('--excel-data', default=str(DEFAULT_EXCEL_DATA),
+                        help="Extracted Excel data whose subjects and teachers are looked up")
+    parser.add_argument('--database-data', default=str(DEFAULT_DATABASE_DATA),
+                        help="Database export holding the candidate subjects and teachers")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="Number of passes over the names (default: 5)")
+    parser.add_argument('--scale', type=int, default=1,
+                        help="Multiply the candidate sets with numbered variants (default: 1)")
+    parser.add_argument('--top-k', type=int, default=8,
+                        help="Candidates scored from the trigram shortlist (default: 8)")
+    args = parser.parse_args()
+
+    comparer = load_comparer()
+    lookups = load_lookups(Path(args.excel_data), Path(args.database_data), args.scale)
+
+    print(f"{'lookup':<10}{'names':>7}{'cands':>7}{'before':>12}{'indexed':>12}{'speedup':>10}"
+          f"{'ratios/name':>13}  (names/s)")
+    for label, names, candidates, threshold in lookups:
+        start = time.perf_counter()
+        matcher = FuzzyMatcher(candidates, comparer.normalize_string, top_k=args.top_k)
+        build_time = time.perf_counter() - start
+
+        # The indexed matcher must return exactly the brute-force matches
+        mismatches = [name for name in names
+                      if matcher.best_match(name, threshold) != comparer.find_best_match(name, candidates, threshold)]
+        if mismatches:
+            raise SystemExit(f"{label}: {len(mismatches)} results differ, e.g. {mismatches[0]!r}")
+
+        matcher.ratios_computed = 0
+        before_rate = measure(lambda name: comparer.find_best_match(name, candidates, threshold), names, args.repeat)
+        after_rate = measure(lambda name: matcher.best_match(name, threshold), names, args.repeat)
+        ratios_per_name = matcher.ratios_computed / (len(names) * args.repeat)
+        print(f"{label:<10}{len(names):>7}{len(candidates):>7}{before_rate:>12,.0f}{after_rate:>12,.0f}"
+              f"{after_rate / before_rate:>9.1f}x{ratios_per_name:>13.1f}  (index built in {build_time * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
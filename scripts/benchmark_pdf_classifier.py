@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the cell-line classifier of the V3 PDF extractor.
+Compares the original per-call re.search loops with the precompiled, memoised
+classifier on the strings of an existing extraction result.
+"""
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from extract_pdf_schedules_v3 import ScheduleExtractorV3
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_CORPUS = REPO_ROOT / "data" / "schedules_extracted_v3_2025-2026.json"
+
+
+class LegacyClassifier:
+    """The classifier as it was before compilation, kept as the benchmark baseline."""
+
+    def __init__(self, extractor: ScheduleExtractorV3):
+        self.classroom_patterns = extractor.classroom_patterns
+        self.classroom_normalizations = extractor.classroom_normalizations
+
+    def is_classroom(self, text: str) -> bool:
+        if not text:
+            return False
+        text = text.strip()
+        if text[:2] in ['P.', 'G.', 'L.', 'P0', 'G0', 'L0', 'P1', 'G1', 'L1', 'P2', 'G2', 'L2']:
+            return True
+        for pattern in self.classroom_patterns:
+            if re.search(pattern, text, re.IGNORECASE):
+                return True
+        return False
+
+    def is_teacher_name(self, text: str) -> bool:
+        if not text or len(text) < 5:
+            return False
+        if len(text.split()) < 2:
+            return False
+        if not text[0].isupper():
+            return False
+        for pattern in [r'^\d+', r'^[PLGM]\d+', r'Sala', r'Aula', r'Taller', r'Laboratori']:
+            if re.search(pattern, text, re.IGNORECASE):
+                return False
+        return True
+
+    def normalize_classroom(self, classroom: str) -> str:
+        if not classroom:
+            return classroom
+        classroom = classroom.strip()
+        for pattern, replacement in self.classroom_normalizations.items():
+            if re.match(pattern, classroom, re.IGNORECASE):
+                classroom = re.sub(pattern, replacement, classroom, flags=re.IGNORECASE)
+                break
+        classroom = re.sub(r'([PLGM])(\d+)\.(\d+)', r'\1.\2.\3', classroom)
+        classroom = re.sub(r'([PLGM])(\d+)\s+(\d+)', r'\1.\2.\3', classroom)
+        if '+' in classroom:
+            classroom = '+'.join(self.normalize_classroom(part.strip()) for part in classroom.split('+'))
+        elif '/' in classroom:
+            classroom = '/'.join(self.normalize_classroom(part.strip()) for part in classroom.split('/'))
+        return classroom
+
+
+def load_corpus(path: Path) -> List[str]:
+    """Collect every subject/teacher/classroom line from an extraction result."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    lines = []
+    for schedule in data['schedules']:
+        for class_info in schedule['classes']:
+            for field in ('subject', 'teacher', 'classroom'):
+                value = class_info.get(field)
+                if value:
+                    lines.extend(line for line in value.split('\n') if line.strip())
+    return lines
+
+
+def measure(classify: Callable[[str], object], lines: List[str], repeat: int,
+            reset: Optional[Callable[[], None]] = None) -> float:
+    """Return classified lines per second over `repeat` passes of the corpus.
+
+    `reset` runs before every pass, e.g. to empty a memo table.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        if reset:
+            reset()
+        for line in lines:
+            classify(line)
+    elapsed = time.perf_counter() - start
+    return len(lines) * repeat / elapsed
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Benchmark the V3 PDF cell-line classifier")
+    parser.add_argument('--corpus', default=str(DEFAULT_CORPUS),
+                        help="Extraction JSON whose strings are used as input")
+    parser.add_argument('--repeat', type=int, default=200,
+                        help="Number of passes over the corpus (default: 200)")
+    args = parser.parse_args()
+
+    lines = load_corpus(Path(args.corpus))
+    extractor = ScheduleExtractorV3()
+    legacy = LegacyClassifier(extractor)
+
+    cases: Dict[str, tuple] = {
+        'is_classroom': (legacy.is_classroom, extractor._is_classroom,
+                         extractor._classroom_memo),
+        'is_teacher_name': (legacy.is_teacher_name, extractor._is_teacher_name,
+                            extractor._teacher_memo),
+        'normalize_classroom': (legacy.normalize_classroom, extractor._normalize_classroom,
+                                extractor._normalized_classroom_memo),
+    }
+
+    print(f"Corpus: {len(lines)} lines ({len(set(lines))} unique) x {args.repeat} passes")
+    print(f"{'function':<22}{'before':>14}{'compiled':>14}{'memoised':>14}{'speedup':>10}  (lines/s)")
+    for name, (before, after, memo) in cases.items():
+        # Both implementations must agree before their speed is compared
+        mismatches = [line for line in lines if before(line) != after(line)]
+        if mismatches:
+            raise SystemExit(f"{name}: {len(mismatches)} results differ, e.g. {mismatches[0]!r}")
+
+        before_rate = measure(before, lines, args.repeat)
+        # Emptying the memo every pass isolates the gain from compiling the patterns
+        compiled_rate = measure(after, lines, args.repeat, reset=memo.clear)
+        after_rate = measure(after, lines, args.repeat)
+        print(f"{name:<22}{before_rate:>14,.0f}{compiled_rate:>14,.0f}{after_rate:>14,.0f}"
+              f"{after_rate / before_rate:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Benchmark and accuracy harness for the three PDF schedule extractor generations.
+Runs every ScheduleExtractor* class over horaris/pdf in its own process and records
+wall time, peak RSS and time per phase, then scores the extracted
+(group, day, subject, classroom) tuples against the hand-transcribed schedules.
+"""
+
+import argparse
+import functools
+import json
+import logging
+import re
+import resource
+import subprocess
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_PDF_DIR = REPO_ROOT / "horaris" / "pdf"
+# Transcribed by hand from the timetable images (see generate_all_schedules.py)
+DEFAULT_GOLDEN = REPO_ROOT / "data" / "all_schedules_data.json"
+DEFAULT_OUTPUT = REPO_ROOT / "data" / "benchmarks" / "pdf_extractors.jsonl"
+
+# module, class, cell-parsing method, organise method
+EXTRACTORS = {
+    'v1': ('extract_pdf_schedules', 'ScheduleExtractor', '_parse_schedule_table', None),
+    'v2': ('extract_pdf_schedules_v2', 'ScheduleExtractorV2', '_parse_schedule_table_v2',
+           '_group_classes_by_group'),
+    'v3': ('extract_pdf_schedules_v3', 'ScheduleExtractorV3', '_extract_classes_from_table',
+           '_organize_schedules'),
+}
+
+PHASES = ['open', 'text', 'tables', 'cell_parsing', 'organise']
+
+
+class PhaseTimer:
+    """Accumulate wall time per phase, counting only the outermost timed call.
+
+    pdfplumber methods call each other (extract_tables -> find_tables), so
+    nested timed calls are attributed to the phase that was entered first.
+    """
+
+    def __init__(self):
+        self.totals = {phase: 0.0 for phase in PHASES}
+        self._depth = 0
+
+    def wrap(self, phase: str, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            if self._depth:
+                return func(*args, **kwargs)
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.totals[phase] += time.perf_counter() - start
+                self._depth -= 1
+        return timed
+
+    def patch(self, owner, name: str, phase: str):
+        """Replace owner.name with a timed wrapper."""
+        setattr(owner, name, self.wrap(phase, getattr(owner, name)))
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_extractor(version: str, pdf_dir: str) -> Dict:
+    """Run one extractor generation with phase timers installed.
+
+    Called in a fresh worker process so peak RSS and patched methods don't
+    leak between generations.
+    """
+    logging.disable(logging.INFO)
+    import pdfplumber
+    from pdfplumber.page import Page
+    from pdfplumber.table import Table
+
+    module_name, class_name, parse_method, organise_method = EXTRACTORS[version]
+    module = __import__(module_name)
+    extractor_class = getattr(module, class_name)
+
+    timer = PhaseTimer()
+    timer.patch(pdfplumber, 'open', 'open')
+    for name in ('extract_text', 'extract_words'):
+        timer.patch(Page, name, 'text')
+    for name in ('extract_tables', 'extract_table', 'find_tables'):
+        timer.patch(Page, name, 'tables')
+    timer.patch(Table, 'extract', 'tables')
+    timer.patch(extractor_class, parse_method, 'cell_parsing')
+    if organise_method:
+        timer.patch(extractor_class, organise_method, 'organise')
+
+    extractor = extractor_class(pdf_dir)
+    start = time.perf_counter()
+    result = extractor.extract_all_pdfs()
+    wall = time.perf_counter() - start
+
+    return {
+        'wall_time_s': round(wall, 3),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'phases_s': {phase: round(seconds, 3) for phase, seconds in timer.totals.items()},
+        'schedules': result['schedules'],
+    }
+
+
+def _strip_accents(text: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
+
+
+def normalize_group(group: str) -> str:
+    """'2n Gràfic Tarda (2 Gt)' / '2 Gt' -> 'gt'."""
+    match = re.search(r'\(([^)]*)\)', group or '')
+    code = match.group(1) if match else (group or '')
+    return re.sub(r'^\d+\s*', '', ' '.join(code.split())).lower()
+
+
+def normalize_subject(subject: str) -> str:
+    subject = _strip_accents(subject or '').lower().replace('’', "'")
+    return ' '.join(subject.split())
+
+
+def normalize_classroom(classroom: Optional[str]) -> str:
+    """Reduce 'P.0.5/0.7', 'P0.5/0.7' and OCR-ish 'PO.5/O.7' to one form."""
+    if not classroom:
+        return ''
+    classroom = _strip_accents(classroom).upper()
+    classroom = re.sub(r'(?<=[PGL.\d/])O(?=[.\d/]|$)', '0', classroom)
+    return re.sub(r'[^A-Z0-9/+]', '', classroom)
+
+
+def to_tuples(schedules: List[Dict]) -> Set[Tuple]:
+    """Turn extractor or golden schedules into (degree, course, group, day, subject, classroom)."""
+    tuples = set()
+    for schedule in schedules:
+        group = normalize_group(schedule.get('group_code') or schedule.get('group'))
+        for class_info in schedule['classes']:
+            subject = normalize_subject(class_info.get('subject'))
+            if not subject or 'tutori' in subject:
+                continue
+            day = class_info.get('day_of_week', class_info.get('day'))
+            tuples.add((schedule['degree'], schedule['course'], group, day, subject,
+                        normalize_classroom(class_info.get('classroom'))))
+    return tuples
+
+
+def score(extracted: Set[Tuple], golden: Set[Tuple], key=lambda t: t) -> Dict:
+    """Precision/recall of extracted against golden after projecting both with key.
+
+    Extracted tuples of degree/course pairs absent from the golden set are
+    ignored, since the golden file doesn't cover every course.
+    """
+    covered = {(t[0], t[1]) for t in golden}
+    extracted_keys = {key(t) for t in extracted if (t[0], t[1]) in covered}
+    golden_keys = {key(t) for t in golden}
+    hits = len(extracted_keys & golden_keys)
+    return {
+        'precision': round(hits / len(extracted_keys), 4) if extracted_keys else 0.0,
+        'recall': round(hits / len(golden_keys), 4) if golden_keys else 0.0,
+        'matched': hits,
+        'extracted': len(extracted_keys),
+        'golden': len(golden_keys),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Benchmark the PDF schedule extractors")
+    parser.add_argument('--pdf-dir', default=str(DEFAULT_PDF_DIR), help="Directory with the PDFs")
+    parser.add_argument('--golden', default=str(DEFAULT_GOLDEN),
+                        help="Reference schedules JSON to score against")
+    parser.add_argument('--output', default=str(DEFAULT_OUTPUT),
+                        help="JSON Lines file the run is appended to")
+    parser.add_argument('--extractors', nargs='+', choices=sorted(EXTRACTORS), default=sorted(EXTRACTORS),
+                        help="Extractor generations to run (default: all)")
+    args = parser.parse_args()
+
+    with open(args.golden, 'r', encoding='utf-8') as f:
+        golden = to_tuples(json.load(f)['schedules'])
+
+    run = {
+        'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'commit': _git_commit(),
+        'extractors': {},
+    }
+
+    for version in args.extractors:
+        # A fresh process per generation keeps peak RSS and patches isolated
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            measured = pool.submit(_run_extractor, version, args.pdf_dir).result()
+
+        extracted = to_tuples(measured.pop('schedules'))
+        measured['accuracy'] = {
+            'group_day_subject_classroom': score(extracted, golden, key=lambda t: t),
+            # Group codes are often misread, so also score without them
+            'day_subject_classroom': score(extracted, golden, key=lambda t: t[:2] + t[3:]),
+        }
+        run['extractors'][version] = measured
+
+        strict = measured['accuracy']['group_day_subject_classroom']
+        loose = measured['accuracy']['day_subject_classroom']
+        phases = ' '.join(f"{phase}={seconds:.2f}s" for phase, seconds in measured['phases_s'].items())
+        print(f"{version}: {measured['wall_time_s']:.2f}s, {measured['peak_rss_mb']:.0f} MB peak | {phases}")
+        print(f"    P/R with group {strict['precision']:.2f}/{strict['recall']:.2f}, "
+              f"without group {loose['precision']:.2f}/{loose['recall']:.2f}")
+
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(run, ensure_ascii=False) + '\n')
+    print(f"Results appended to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,8 @@ from collections import defaultdict
 import re
 from difflib import SequenceMatcher
 
+from fuzzy_matcher import FuzzyMatcher
+
 # File paths
 EXCEL_DATA_FILE = '/Users/josepmarimon/Documents/github/bau-assist/csv/extracted_excel_data_fixed.json'
 DATABASE_DATA_FILE = '/Users/josepmarimon/Documents/github/bau-assist/csv/extracted_database_data.json'
@@ -42,7 +44,11 @@ def similarity_ratio(s1, s2):
     return SequenceMatcher(None, normalize_string(s1), normalize_string(s2)).ratio()
 
 def find_best_match(name, candidates, threshold=0.8):
-    """Find best matching candidate for a given name"""
+    """Find best matching candidate for a given name
+    
+    Compares the name with every candidate; the comparisons below use a
+    FuzzyMatcher built once per candidate set, which returns the same match.
+    """
     best_match = None
     best_ratio = 0
     
@@ -77,6 +83,7 @@ def compare_subjects(excel_subjects, db_subjects):
     
     # Find matches and differences
     matched_db = set()
+    db_matcher = FuzzyMatcher(db_by_name, normalize_string)
     
     for excel_name, excel_subjs in excel_by_name.items():
         # Try exact match first
@@ -86,7 +93,7 @@ def compare_subjects(excel_subjects, db_subjects):
             matched_db.add(excel_name)
         else:
             # Try fuzzy match
-            best_match, ratio = find_best_match(excel_name, db_by_name.keys())
+            best_match, ratio = db_matcher.best_match(excel_name)
             if best_match:
                 db_match = db_by_name[best_match]
                 matched_db.add(best_match)
@@ -181,6 +188,7 @@ def compare_teachers(excel_data, db_teachers):
     }
     
     matched_db = set()
+    db_matcher = FuzzyMatcher(db_teacher_names, normalize_string)
     
     for excel_teacher in excel_teachers:
         # Try exact match
@@ -192,7 +200,7 @@ def compare_teachers(excel_data, db_teachers):
             matched_db.add(excel_teacher)
         else:
             # Try fuzzy match
-            best_match, ratio = find_best_match(excel_teacher, db_teacher_names.keys(), threshold=0.7)
+            best_match, ratio = db_matcher.best_match(excel_teacher, threshold=0.7)
             if best_match:
                 comparison['possible_matches'].append({
                     'excel_name': excel_teacher,
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Precompiled cell classifier shared by the Excel timetable extractors.
+Decides in a single regex scan whether a cell is a header/time/label to skip
+and which itinerari (if any) its text refers to.
+"""
+
+import re
+
+
+class CellClassifier:
+    """Skip decision and itinerari of a cell value, built once per run.
+
+    skip_patterns are case-sensitive literals; itinerari_keywords maps each
+    itinerari to keywords matched case-insensitively. Every keyword and skip
+    literal becomes one alternative of a single lookahead regex, so finditer
+    reports each occurrence, overlapping ones included, in one pass over the
+    string. When several itineraris occur the first one in itinerari_keywords
+    order wins.
+    """
+
+    def __init__(self, skip_patterns, itinerari_keywords):
+        self.itineraris = list(itinerari_keywords)
+
+        # Group i+1 is itinerari i, the last group is the skip literals.
+        # Keywords that are a prefix of a skip literal (or vice versa) would
+        # shadow each other at the same offset, so refuse them up front.
+        for keywords in itinerari_keywords.values():
+            for keyword in keywords:
+                for pattern in skip_patterns:
+                    if keyword.lower().startswith(pattern.lower()) or pattern.lower().startswith(keyword.lower()):
+                        raise ValueError(f"Itinerari keyword {keyword!r} overlaps skip pattern {pattern!r}")
+
+        alternatives = [
+            '(?i:(' + '|'.join(re.escape(keyword.lower()) for keyword in keywords) + '))'
+            for keywords in itinerari_keywords.values()
+        ]
+        alternatives.append('(' + '|'.join(re.escape(pattern) for pattern in skip_patterns) + ')')
+        self.skip_group = len(alternatives)
+        self.regex = re.compile('(?=' + '|'.join(alternatives) + ')')
+
+        self._memo = {}
+
+    def classify(self, text):
+        """Return (skip, itinerari) for a cell string; itinerari may be None."""
+        result = self._memo.get(text)
+        if result is None:
+            skip = False
+            best = len(self.itineraris)
+            for match in self.regex.finditer(text):
+                group = match.lastindex
+                if group == self.skip_group:
+                    skip = True
+                elif group - 1 < best:
+                    best = group - 1
+            result = (skip, self.itineraris[best] if best < len(self.itineraris) else None)
+            self._memo[text] = result
+        return result
+
+    def is_skipped(self, text):
+        return self.classify(text)[0]
+
+    def itinerari(self, text):
+        return self.classify(text)[1]
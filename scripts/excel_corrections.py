@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Indexed correction tables for the Excel schedule extraction.
+Loads the versioned rules of csv/excel_corrections.json into hash sets, dicts
+and compiled regexes, applies them in one pass per entry and counts how often
+every rule fires so that dead rules can be pruned.
+"""
+
+import json
+import os
+import re
+from collections import Counter
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  '..', 'csv', 'excel_corrections.json')
+SUPPORTED_VERSION = 3
+
+
+class ExcelCorrections:
+    """Correction rules for extracted Excel entries.
+
+    counters is keyed by (rule family, rule) and counts every time a rule
+    changed or dropped something; unused_rules() lists the rules that never
+    fired.
+    """
+
+    def __init__(self, rules):
+        if rules.get('version') != SUPPORTED_VERSION:
+            raise ValueError(f"Unsupported corrections version {rules.get('version')!r}, "
+                             f"expected {SUPPORTED_VERSION}")
+        self.version = rules['version']
+
+        self.remove_subjects = set(rules['remove_subjects'])
+        self.subject_corrections = dict(rules['subject_corrections'])
+        self.classroom_corrections = dict(rules['classroom_corrections'])
+
+        # One alternative per removal pattern; the patterns must not capture,
+        # so match.lastindex tells which one fired
+        self.professor_removals = list(rules['professor_removals'])
+        self.professor_removal_regex = re.compile(
+            '|'.join(f'({pattern})' for pattern in self.professor_removals))
+
+        self.gba_skip_subjects = set(rules['gba_skip_subjects'])
+        self.gba_min_subject_length = rules['gba_min_subject_length']
+
+        self.counters = Counter()
+
+    @classmethod
+    def load(cls, path=DEFAULT_RULES_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def _remove_professor_part(self, match):
+        self.counters['professor_removals', self.professor_removals[match.lastindex - 1]] += 1
+        return ''
+
+    def fix_entry(self, entry):
+        """Correct one extracted entry in place.
+
+        Returns (entry, fixes) where entry is None when the entry must be
+        dropped and fixes counts the subject name changes.
+        """
+        subject_name = entry.get('asignatura', '')
+
+        # Entries that are not real subjects
+        for name in (subject_name, subject_name.strip()):
+            if name in self.remove_subjects:
+                self.counters['remove_subjects', name] += 1
+                return None, 0
+
+        fixes = 0
+        corrected = self.subject_corrections.get(subject_name)
+        if corrected is not None:
+            self.counters['subject_corrections', subject_name] += 1
+            entry['asignatura'] = subject_name = corrected
+            fixes += 1
+
+        # Remove line breaks and multiple spaces
+        cleaned_name = re.sub(r'\s+', ' ', subject_name.replace('\n', ' ')).strip()
+        if cleaned_name != subject_name:
+            entry['asignatura'] = cleaned_name
+            fixes += 1
+
+        # Clean professor names that include classroom info
+        if entry.get('profesor'):
+            professor = self.professor_removal_regex.sub(self._remove_professor_part, entry['profesor'])
+            professor = re.sub(r'\s+', ' ', re.sub(r'\s+\+\s+', ' ', professor)).strip()
+
+            # Remove if professor name is too short or looks like a code
+            if len(professor) < 3 or re.match(r'^[A-Z][0-9]', professor):
+                professor = None
+            entry['profesor'] = professor
+
+        if entry.get('aulas'):
+            fixed_aulas = []
+            for aula in entry['aulas']:
+                corrected = self.classroom_corrections.get(aula)
+                if corrected is not None:
+                    self.counters['classroom_corrections', aula] += 1
+                    aula = corrected
+                fixed_aulas.append(aula)
+            entry['aulas'] = fixed_aulas
+
+        return entry, fixes
+
+    def apply(self, entries):
+        """Correct a list of entries, dropping the ones that are not subjects"""
+        fixed = []
+        for entry in entries:
+            entry, _ = self.fix_entry(entry)
+            if entry is not None:
+                fixed.append(entry)
+        return fixed
+
+    def is_gba_non_subject(self, subject):
+        """True for drawing texts that are labels rather than subjects"""
+        if subject in self.gba_skip_subjects:
+            self.counters['gba_skip_subjects', subject] += 1
+            return True
+        return len(subject) < self.gba_min_subject_length
+
+    def rules(self):
+        """All (rule family, rule) pairs that can be counted"""
+        for family in ('remove_subjects', 'subject_corrections', 'classroom_corrections',
+                       'professor_removals', 'gba_skip_subjects'):
+            for rule in getattr(self, family):
+                yield family, rule
+
+    def unused_rules(self):
+        return [rule for rule in self.rules() if not self.counters[rule]]
+
+    def report(self):
+        """Print how often each rule fired, listing the dead ones last"""
+        print(f"\nCorrection rules (version {self.version}):")
+        for (family, rule), count in sorted(self.counters.items(), key=lambda item: -item[1]):
+            print(f"  {count:5d}  {family}: {rule!r}")
+        unused = self.unused_rules()
+        if unused:
+            print(f"  {len(unused)} rules never fired:")
+            for family, rule in unused:
+                print(f"         {family}: {rule!r}")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Per-row-band semester and group context for the Excel timetable extractors.
+A sheet can hold several timetables one below the other (first and second
+semester, or one block per group); every block gets the semester and group
+headers found above it instead of the last ones seen anywhere in the sheet.
+"""
+
+from bisect import bisect_right
+
+
+class RowBands:
+    """Semester and group headers of one sheet, split into bands of rows.
+
+    Feed the headers and subject candidates in row-major order with
+    add_semester(), add_group() and add_candidate(), call finish(), then ask
+    context(row) for the (semester, groups) of any row.
+
+    A header row opens a new band once subject candidates have been seen in
+    the current one; until then further headers extend it (several group rows,
+    the title mentioning the semester, ...). A new band keeps the semester and
+    groups of the previous band until it declares its own. Leading bands
+    without a header of their own take the first one below them, so a
+    single-timetable sheet gets one context for all of its rows.
+    """
+
+    def __init__(self):
+        self.starts = [1]
+        self.semesters = [None]
+        self.groups = [[]]
+        self._groups_inherited = False
+        self._band_candidate_row = None
+        self._last_candidate_row = None
+
+    def _header(self, row):
+        """Open a new band at row if the current one already has candidates above it."""
+        if self._band_candidate_row is None or self._band_candidate_row >= row:
+            return
+        self.starts.append(row)
+        self.semesters.append(self.semesters[-1])
+        self.groups.append(self.groups[-1])
+        self._groups_inherited = True
+        # Candidates earlier in this same row belong to the new band
+        self._band_candidate_row = row if self._last_candidate_row == row else None
+
+    def add_semester(self, row, semester):
+        self._header(row)
+        self.semesters[-1] = semester
+
+    def add_group(self, row, group):
+        self._header(row)
+        if self._groups_inherited:
+            self.groups[-1] = []
+            self._groups_inherited = False
+        self.groups[-1].append(group)
+
+    def add_candidate(self, row):
+        self._last_candidate_row = row
+        if self._band_candidate_row is None:
+            self._band_candidate_row = row
+
+    def finish(self):
+        """Back-fill the leading bands that have no semester or groups yet."""
+        for band in range(len(self.starts) - 2, -1, -1):
+            if self.semesters[band] is None:
+                self.semesters[band] = self.semesters[band + 1]
+            if not self.groups[band]:
+                self.groups[band] = self.groups[band + 1]
+        return self
+
+    def band(self, row):
+        return bisect_right(self.starts, row) - 1
+
+    def context(self, row):
+        """Return (semester, groups) of the band holding row."""
+        band = self.band(row)
+        return self.semesters[band], self.groups[band]
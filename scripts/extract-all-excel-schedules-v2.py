@@ -9,7 +9,16 @@ import numpy as np
 import os
 import re
 import json
+import argparse
+import functools
+import traceback
+from concurrent.futures import ProcessPoolExecutor
 from openpyxl import load_workbook
+from excel_cell_classifier import CellClassifier
+from excel_row_bands import RowBands
+import xlsx_fast_reader
+from excel_corrections import ExcelCorrections
+from extraction_store import DEFAULT_STORE_FILE, ExtractionStore
 from datetime import datetime
 from collections import defaultdict
 
@@ -17,6 +26,11 @@ from collections import defaultdict
 EXCEL_DIR = '/Users/josepmarimon/Documents/github/bau-assist/csv/excelhorari'
 OUTPUT_FILE = '/Users/josepmarimon/Documents/github/bau-assist/csv/extracted_excel_data_v2.json'
 
+# Key of this extractor's results in the extraction store; bump the version
+# whenever a parsing change should invalidate the stored results
+EXTRACTOR_NAME = 'excel_cells_v2'
+EXTRACTOR_VERSION = '2.1'
+
 def is_white_background(cell):
     """Check if a cell has white background (placeholder)"""
     if cell.fill and cell.fill.patternType:
@@ -27,6 +41,79 @@ def is_white_background(cell):
                     return True
     return False
 
+class LazyWhiteFill:
+    """is_white_background(cell), looked up only when the flag is tested.
+    
+    The scans test it for subject candidates only, so the fills of headers,
+    group codes and short values are never resolved.
+    """
+    
+    __slots__ = ('cell',)
+    
+    def __init__(self, cell):
+        self.cell = cell
+    
+    def __bool__(self):
+        return is_white_background(self.cell)
+
+def iter_worksheet_cells(ws):
+    """Yield (row, col, value, is_white_fill) for the cells of ws with a value, row by row.
+    
+    is_white_fill is False for non-string cells, which cannot be subjects,
+    and a LazyWhiteFill for string cells. Read-only padding cells carry no
+    coordinates, hence the enumerate.
+    """
+    for row, row_cells in enumerate(ws.iter_rows(values_only=False), start=1):
+        for col, cell in enumerate(row_cells, start=1):
+            raw = cell.value
+            if raw is not None:
+                yield row, col, raw, LazyWhiteFill(cell) if isinstance(raw, str) else False
+
+def iter_workbook_sheets(file_path, read_only=True, reader='openpyxl'):
+    """Yield (sheet name, cells) for every visible worksheet, opening the workbook once.
+    
+    cells is a (row, col, value, is_white_fill) stream; consume it before
+    moving on to the next sheet. read_only=True streams the sheet XML instead
+    of materialising every cell and style object; cell fills are still
+    resolved from the shared stylesheet, so is_white_background works on the
+    streamed cells. reader='ooxml' parses the sheet XML directly (see
+    xlsx_fast_reader) instead of going through openpyxl; both yield the same
+    tuples.
+    """
+    if reader == 'ooxml':
+        yield from xlsx_fast_reader.iter_sheets(file_path)
+        return
+    
+    wb = load_workbook(file_path, data_only=True, read_only=read_only)
+    try:
+        for ws in wb.worksheets:
+            if ws.sheet_state == 'visible':
+                yield ws.title, iter_worksheet_cells(ws)
+    finally:
+        wb.close()
+
+def read_grid(cells, max_row=None):
+    """Collect (row, col, value, ...) cells into a list of row value lists.
+    
+    Rows are only as long as their last cell; read them with grid_value.
+    """
+    grid = []
+    for row, col, value, _ in cells:
+        if max_row is not None and row > max_row:
+            break
+        while len(grid) < row:
+            grid.append([])
+        grid_row = grid[row - 1]
+        grid_row.extend([None] * (col - len(grid_row)))
+        grid_row[col - 1] = value
+    return grid
+
+def grid_value(grid, row, col):
+    """Value at 1-based (row, col) of a grid read with values_only, or None."""
+    if row - 1 < len(grid) and col - 1 < len(grid[row - 1]):
+        return grid[row - 1][col - 1]
+    return None
+
 def parse_filename(filename):
     """Extract metadata from filename"""
     info = {}
@@ -106,10 +193,13 @@ def extract_subjects_from_multi_option_cell(cell_value):
     
     return subjects
 
-def extract_gba_optatives_data(file_path, file_info):
-    """Special extraction for GBA optatives file with multi-column layout"""
-    wb = load_workbook(file_path, data_only=True)
-    ws = wb.active
+def extract_gba_optatives_data(file_path, file_info, cells):
+    """Special extraction for GBA optatives file with multi-column layout
+    
+    cells is the (row, col, value, is_white_fill) stream of one sheet.
+    """
+    # Only values of the first 30 rows are needed
+    grid = read_grid(cells, max_row=30)
     
     extracted_data = []
     
@@ -119,9 +209,9 @@ def extract_gba_optatives_data(file_path, file_info):
     
     for row in range(4, 30):  # Typical range where subjects appear
         for col in subject_columns:
-            cell = ws.cell(row=row, column=col)
-            if cell.value and isinstance(cell.value, str):
-                value = str(cell.value).strip()
+            cell_value = grid_value(grid, row, col)
+            if cell_value and isinstance(cell_value, str):
+                value = str(cell_value).strip()
                 
                 # Skip common non-subject values
                 if value in ['tutories', 'tutories P0.10', '1r semestre', '2n semestre'] or len(value) < 5:
@@ -149,12 +239,12 @@ def extract_gba_optatives_data(file_path, file_info):
                 else:
                     # Single subject entry
                     # Check if next row has professor info
-                    next_cell = ws.cell(row=row+1, column=col) if row < ws.max_row else None
+                    next_cell_value = grid_value(grid, row + 1, col)
                     professor = None
                     classrooms = []
                     
-                    if next_cell and next_cell.value:
-                        next_value = str(next_cell.value).strip()
+                    if next_cell_value:
+                        next_value = str(next_cell_value).strip()
                         classrooms = re.findall(r'[PGL]\d+\.\d+(?:/\d+)?', next_value)
                         
                         # Extract professor
@@ -186,196 +276,459 @@ def extract_gba_optatives_data(file_path, file_info):
     
     return extracted_data
 
-def extract_schedule_data(file_path, file_info):
-    """Extract schedule data - use special handling for GBA optatives"""
+# Skip patterns for cells that are headers, times or labels rather than subjects
+SKIP_PATTERNS = [
+    'DILLUNS', 'DIMARTS', 'DIMECRES', 'DIJOUS', 'DIVENDRES',
+    'SEMESTRE', '09:00', '10:00', '11:00', '11:30', '12:00', '12:30',
+    '13:00', '13:30', '14:00', '14:30', '15:00', '15:30', '16:00',
+    '16:30', '17:00', '17:30', '18:00', '18:30', '19:00', '19:30',
+    '20:00', '20:30', 'Tutories', 'CURS', 'NaN', 'lr ', '2n ', 
+    '1r ', '3r ', '4t '
+]
+
+# Keywords (lowercase) that tie a subject to an itinerari; earlier entries win
+ITINERARI_KEYWORDS = {
+    'Videojocs': ['videojocs', 'game', 'jocs'],
+    'Animació': ['animació', 'animation'],
+    'Audiovisual': ['audiovisual', 'vídeo', 'cinema', 'llenguatges audiovisuals'],
+    'Gràfic': ['gràfic', 'comunicació visual', 'disseny gràfic', 'expressió gràfica'],
+    'Moda': ['moda', 'fashion'],
+    'Interiors': ['interiors', 'espais'],
+    'Producte': ['producte', 'product'],
+    'Web': ['web', 'digital', 'interactiu', 'creació i autoria digital'],
+    'Tipografia': ['tipografia', 'type'],
+    'Fotografia': ['fotografia', 'photo'],
+    'Il·lustració': ['il·lustració', 'illustration']
+}
+
+GROUP_PATTERN = re.compile(r'^[GMAgma]\d+$', re.IGNORECASE)
+
+CELL_CLASSIFIER = CellClassifier(SKIP_PATTERNS, ITINERARI_KEYWORDS)
+
+def scan_cells(cells):
+    """Scan the (row, col, value, is_white_fill) cells of a sheet in one pass.
     
-    # Special handling for GBA optatives file
+    Group and semester headers (see RowBands), the empty-file probe (rows
+    1-29, columns 1-19) and subject candidates (rows 5+) are all fed from the
+    same row-ordered stream (see iter_workbook_sheets), so every cell is read
+    once. A subject candidate stays pending for one row to pick up the value
+    of the cell below it.
+    """
+    bands = RowBands()
+    non_empty = 0
+    candidates = []
+    pending = {}
+    row_candidates = {}
+    current_row = None
+    
+    for row, col, raw, is_white in cells:
+        if row != current_row:
+            # Only candidates of the row right above are still pending
+            pending = row_candidates if current_row is not None and row == current_row + 1 else {}
+            row_candidates = {}
+            current_row = row
+        
+        # The cell below a subject holds its professor and classrooms
+        if col in pending:
+            pending[col][4] = raw
+        
+        if raw and str(raw).strip() and row < 30 and col < 20:
+            non_empty += 1
+        
+        if not raw or not isinstance(raw, str):
+            continue
+        value = raw.strip()
+        
+        if GROUP_PATTERN.match(value):
+            bands.add_group(row, value.upper())
+            continue
+        
+        value_lower = value.lower()
+        if '1r semestre' in value_lower or 'primer semestre' in value_lower:
+            bands.add_semester(row, 1)
+        elif '2n semestre' in value_lower or 'segon semestre' in value_lower:
+            bands.add_semester(row, 2)
+        
+        if row < 5 or len(value) < 3:
+            continue
+        if CELL_CLASSIFIER.is_skipped(value):
+            continue
+        
+        # [row, col, subject, is_placeholder, value of the cell below]
+        candidate = [row, col, value, bool(is_white), None]
+        candidates.append(candidate)
+        row_candidates[col] = candidate
+        bands.add_candidate(row)
+
+    return {
+        'bands': bands.finish(),
+        'non_empty': non_empty,
+        'candidates': candidates,
+    }
+
+def group_for_column(groups, col):
+    """Group of a subject in column col: one group per block of 4 columns from column 3"""
+    if len(groups) == 1:
+        return groups[0]
+    if groups:
+        group_index = min((col - 3) // 4, len(groups) - 1)
+        if group_index >= 0:
+            return groups[group_index]
+    return None
+
+def extract_schedule_data(file_path, file_info, read_only=True, reader='openpyxl', sheets=None):
+    """Extract schedule data from every visible sheet of a workbook
+    
+    sheets is an already open iterable of (sheet name, cells) pairs (see
+    iter_workbook_sheets); when None the workbook is read from file_path.
+    GBA optatives files get their special handling on every sheet.
+    """
+    if sheets is None:
+        sheets = iter_workbook_sheets(file_path, read_only, reader)
+    
+    extract_sheet = extract_sheet_data
     if 'Optativitat' in os.path.basename(file_path):
-        return extract_gba_optatives_data(file_path, file_info)
+        extract_sheet = extract_gba_optatives_data
+    
+    extracted_data = []
+    for sheet_name, cells in sheets:
+        extracted_data.extend(extract_sheet(file_path, file_info, cells))
+    return extracted_data
+
+def extract_sheet_data(file_path, file_info, cells):
+    """Extract the schedule entries of one sheet from its cell stream"""
+    # Read the sheet once and scan it in a single pass
+    scan = scan_cells(cells)
     
     # Check if it's an empty GBA file
     if file_info.get('grado_code') == 'GBA':
-        wb = load_workbook(file_path, data_only=True)
-        ws = wb.active
-        
-        # Count non-empty cells
-        non_empty = 0
-        for row in range(1, min(30, ws.max_row + 1)):
-            for col in range(1, min(20, ws.max_column + 1)):
-                cell = ws.cell(row=row, column=col)
-                if cell.value and str(cell.value).strip():
-                    non_empty += 1
-        
         # If file has very few non-empty cells, it's probably empty
+        non_empty = scan['non_empty']
         if non_empty < 20:
             print(f"    File appears to be empty (only {non_empty} non-empty cells)")
             return []
     
-    # Original extraction logic for GDIS files
-    wb = load_workbook(file_path, data_only=True)
-    ws = wb.active
-    
     extracted_data = []
-    
-    # Find groups in the file
-    groups = []
-    for row in range(1, min(10, ws.max_row + 1)):
-        for col in range(1, ws.max_column + 1):
-            cell = ws.cell(row=row, column=col)
-            if cell.value and isinstance(cell.value, str):
-                value = str(cell.value).strip()
-                if re.match(r'^[GMAgma]\d+$', value, re.IGNORECASE):
-                    groups.append(value.upper())
-    
-    # Find semester information
-    semester = None
-    for row in range(1, min(15, ws.max_row + 1)):
-        for col in range(1, ws.max_column + 1):
-            cell = ws.cell(row=row, column=col)
-            if cell.value and isinstance(cell.value, str):
-                value = str(cell.value).strip().lower()
-                if '1r semestre' in value or 'primer semestre' in value:
-                    semester = 1
-                elif '2n semestre' in value or 'segon semestre' in value:
-                    semester = 2
+    bands = scan['bands']
     
     # Extract courses with details
-    for row in range(5, ws.max_row + 1):
-        for col in range(1, ws.max_column + 1):
-            cell = ws.cell(row=row, column=col)
-            
-            if not cell.value or not isinstance(cell.value, str) or len(str(cell.value).strip()) < 3:
-                continue
-                
-            value = str(cell.value).strip()
+    for row, col, value, is_placeholder, next_raw in scan['candidates']:
+        if next_raw:
+            next_value = str(next_raw).strip()
             
-            # Skip patterns
-            skip_patterns = [
-                'DILLUNS', 'DIMARTS', 'DIMECRES', 'DIJOUS', 'DIVENDRES',
-                'SEMESTRE', '09:00', '10:00', '11:00', '11:30', '12:00', '12:30',
-                '13:00', '13:30', '14:00', '14:30', '15:00', '15:30', '16:00',
-                '16:30', '17:00', '17:30', '18:00', '18:30', '19:00', '19:30',
-                '20:00', '20:30', 'Tutories', 'CURS', 'NaN', 'lr ', '2n ', 
-                '1r ', '3r ', '4t '
-            ]
+            classrooms = re.findall(r'[PGLC][0-9]\.[0-9]+(?:/[0-9]+)?', next_value)
+            special_rooms = re.findall(r'(?:Platós|Sala\s+\w+|Lab\s+\w+)', next_value)
+            classrooms.extend(special_rooms)
             
-            if any(pattern in value for pattern in skip_patterns):
-                continue
+            if classrooms or len(next_value) > 2:
+                professor = next_value
+                for classroom in classrooms:
+                    professor = professor.replace(classroom, '')
                 
-            if re.match(r'^[GMAgma]\d+$', value, re.IGNORECASE):
-                continue
-            
-            is_placeholder = is_white_background(cell)
-            
-            next_cell = ws.cell(row=row+1, column=col) if row < ws.max_row else None
-            
-            if next_cell and next_cell.value:
-                next_value = str(next_cell.value).strip()
+                professor = re.sub(r'\s+', ' ', professor).strip()
+                professor = professor.replace('+', ' ').strip()
                 
-                classrooms = re.findall(r'[PGLC][0-9]\.[0-9]+(?:/[0-9]+)?', next_value)
-                special_rooms = re.findall(r'(?:Platós|Sala\s+\w+|Lab\s+\w+)', next_value)
-                classrooms.extend(special_rooms)
+                semester, groups = bands.context(row)
+                group = group_for_column(groups, col)
                 
-                if classrooms or len(next_value) > 2:
-                    professor = next_value
-                    for classroom in classrooms:
-                        professor = professor.replace(classroom, '')
-                    
-                    professor = re.sub(r'\s+', ' ', professor).strip()
-                    professor = professor.replace('+', ' ').strip()
-                    
-                    group = None
-                    if groups:
-                        if len(groups) == 1:
-                            group = groups[0]
-                        else:
-                            group_index = min((col - 3) // 4, len(groups) - 1)
-                            if group_index >= 0 and group_index < len(groups):
-                                group = groups[group_index]
-                    
-                    # Extract itinerari
-                    itinerari = None
-                    subject_lower = value.lower()
-                    itinerari_patterns = {
-                        'Videojocs': ['videojocs', 'game', 'jocs'],
-                        'Animació': ['animació', 'animation'],
-                        'Audiovisual': ['audiovisual', 'vídeo', 'cinema', 'llenguatges audiovisuals'],
-                        'Gràfic': ['gràfic', 'comunicació visual', 'disseny gràfic', 'expressió gràfica'],
-                        'Moda': ['moda', 'fashion'],
-                        'Interiors': ['interiors', 'espais'],
-                        'Producte': ['producte', 'product'],
-                        'Web': ['web', 'digital', 'interactiu', 'creació i autoria digital'],
-                        'Tipografia': ['tipografia', 'type'],
-                        'Fotografia': ['fotografia', 'photo'],
-                        'Il·lustració': ['il·lustració', 'illustration']
-                    }
-                    
-                    for iti, keywords in itinerari_patterns.items():
-                        for keyword in keywords:
-                            if keyword in subject_lower:
-                                itinerari = iti
-                                break
-                    
-                    subject_type = file_info.get('tipo', 'Obligatoria')
-                    if 'optativ' in value.lower() or 'electiv' in value.lower():
-                        subject_type = 'Optativa'
-                    elif 'tfg' in value.lower() or 'treball final' in value.lower():
-                        subject_type = 'TFG'
-                    
-                    course_data = {
-                        'grado': file_info.get('grado', ''),
-                        'grado_code': file_info.get('grado_code', ''),
-                        'curso': file_info.get('curso', ''),
-                        'semestre': semester,
-                        'tipo': subject_type,
-                        'itinerari': itinerari,
-                        'asignatura': value,
-                        'grupo': group or 'Unknown',
-                        'aulas': classrooms,
-                        'profesor': professor if professor else None,
-                        'es_placeholder': is_placeholder,
-                        'archivo': os.path.basename(file_path)
-                    }
-                    
-                    if not is_placeholder:
-                        extracted_data.append(course_data)
+                # Extract itinerari
+                itinerari = CELL_CLASSIFIER.itinerari(value)
+                
+                subject_type = file_info.get('tipo', 'Obligatoria')
+                if 'optativ' in value.lower() or 'electiv' in value.lower():
+                    subject_type = 'Optativa'
+                elif 'tfg' in value.lower() or 'treball final' in value.lower():
+                    subject_type = 'TFG'
+                
+                course_data = {
+                    'grado': file_info.get('grado', ''),
+                    'grado_code': file_info.get('grado_code', ''),
+                    'curso': file_info.get('curso', ''),
+                    'semestre': semester,
+                    'tipo': subject_type,
+                    'itinerari': itinerari,
+                    'asignatura': value,
+                    'grupo': group or 'Unknown',
+                    'aulas': classrooms,
+                    'profesor': professor if professor else None,
+                    'es_placeholder': is_placeholder,
+                    'archivo': os.path.basename(file_path)
+                }
+                
+                if not is_placeholder:
+                    extracted_data.append(course_data)
+    
+    return extracted_data
+
+CLASSROOM_PATTERN = re.compile(r'[PGLC][0-9]\.[0-9]+(?:/[0-9]+)?')
+SPECIAL_ROOM_PATTERN = re.compile(r'(?:Platós|Sala\s+\w+|Lab\s+\w+)')
+SKIP_REGEX = re.compile('|'.join(re.escape(pattern) for pattern in SKIP_PATTERNS))
+
+def load_sheet_arrays(cells):
+    """Load (row, col, value, is_white_fill) cells into parallel 2-D arrays.
+    
+    Returns (values, white) where values is an object array of the raw cell
+    values (None where a cell is empty) and white holds the is_white_fill
+    flags as given, so lazy flags are only tested for the candidates.
+    """
+    cells = list(cells)
+    n_rows = max((row for row, _, _, _ in cells), default=0)
+    n_cols = max((col for _, col, _, _ in cells), default=0)
+    values = np.full((n_rows, n_cols), None, dtype=object)
+    white = np.full((n_rows, n_cols), False, dtype=object)
+    for row, col, value, is_white in cells:
+        values[row - 1, col - 1] = value
+        white[row - 1, col - 1] = is_white
+    return values, white
+
+def extract_schedule_data_vectorized(file_path, file_info, read_only=True, reader='openpyxl', sheets=None):
+    """Vectorised equivalent of extract_schedule_data.
+    
+    Returns the same record list as extract_schedule_data, sheet by sheet.
+    """
+    if sheets is None:
+        sheets = iter_workbook_sheets(file_path, read_only, reader)
     
+    extract_sheet = extract_sheet_data_vectorized
+    if 'Optativitat' in os.path.basename(file_path):
+        extract_sheet = extract_gba_optatives_data
+    
+    extracted_data = []
+    for sheet_name, cells in sheets:
+        extracted_data.extend(extract_sheet(file_path, file_info, cells))
     return extracted_data
 
+def extract_sheet_data_vectorized(file_path, file_info, cells):
+    """Vectorised equivalent of extract_sheet_data.
+    
+    The sheet is loaded into a value array and its white-fill flags; candidate
+    selection, subject/next-row pairing, classroom extraction and the
+    group-column mapping then run as whole-column pandas/NumPy operations.
+    Only the few header and candidate cells go through RowBands one by one.
+    """
+    values, white = load_sheet_arrays(cells)
+    
+    n_rows, n_cols = values.shape
+    is_str = (np.vectorize(lambda raw: isinstance(raw, str), otypes=[bool])(values) if values.size
+              else np.zeros(values.shape, dtype=bool))
+    # Stripped text of string cells, '' elsewhere
+    text = pd.Series(np.where(is_str, values, '').ravel()).str.strip()
+    rows = np.repeat(np.arange(1, n_rows + 1), n_cols)
+    cols = np.tile(np.arange(1, n_cols + 1), n_rows)
+    
+    if file_info.get('grado_code') == 'GBA':
+        probe = values[:29, :19].ravel()
+        non_empty = sum(1 for raw in probe if raw and str(raw).strip())
+        if non_empty < 20:
+            print(f"    File appears to be empty (only {non_empty} non-empty cells)")
+            return []
+    
+    has_text = is_str.ravel() & (text != '').to_numpy()
+    is_group = has_text & text.str.match(GROUP_PATTERN).to_numpy()
+    
+    lower = text.str.lower()
+    first = lower.str.contains('1r semestre', regex=False) | lower.str.contains('primer semestre', regex=False)
+    second = lower.str.contains('2n semestre', regex=False) | lower.str.contains('segon semestre', regex=False)
+    semester_marks = np.where(first, 1, np.where(second, 2, 0)) * has_text
+    
+    # Subject candidates and the raw value of the cell below each of them
+    candidate = (has_text & (rows >= 5) & (text.str.len() >= 3).to_numpy()
+                 & ~text.str.contains(SKIP_REGEX).to_numpy() & ~is_group)
+    
+    # Group and semester headers split the sheet into bands, fed in row-major order
+    bands = RowBands()
+    for index in np.flatnonzero(is_group | (semester_marks > 0) | candidate):
+        if is_group[index]:
+            bands.add_group(rows[index], text[index].upper())
+            continue
+        if semester_marks[index]:
+            bands.add_semester(rows[index], int(semester_marks[index]))
+        if candidate[index]:
+            bands.add_candidate(rows[index])
+    bands.finish()
+    
+    below = np.vstack([values[1:], np.full((1, n_cols), None, dtype=object)]).ravel()
+    next_raw = pd.Series(below[candidate])
+    has_next = next_raw.map(bool).to_numpy() if len(next_raw) else np.zeros(0, dtype=bool)
+    
+    subjects = text[candidate][has_next].reset_index(drop=True)
+    cand_rows = rows[candidate][has_next]
+    cand_cols = cols[candidate][has_next]
+    placeholder = np.array([bool(is_white) for is_white in white.ravel()[candidate][has_next]], dtype=bool)
+    next_value = next_raw[has_next].astype(str).str.strip().reset_index(drop=True)
+    
+    classrooms = next_value.str.findall(CLASSROOM_PATTERN) + next_value.str.findall(SPECIAL_ROOM_PATTERN)
+    keep = ((classrooms.str.len() > 0) | (next_value.str.len() > 2)).to_numpy() & ~placeholder
+    subjects = subjects[keep].reset_index(drop=True)
+    next_value = next_value[keep].reset_index(drop=True)
+    classrooms = classrooms[keep].reset_index(drop=True)
+    cand_rows = cand_rows[keep]
+    cand_cols = cand_cols[keep]
+    
+    # Remove each classroom from the professor line, as the cell loop does
+    professor = pd.Series([
+        functools.reduce(lambda remaining, classroom: remaining.replace(classroom, ''), rooms, value)
+        for value, rooms in zip(next_value, classrooms)
+    ], dtype=object)
+    professor = (professor.str.replace(r'\s+', ' ', regex=True).str.strip()
+                 .str.replace('+', ' ', regex=False).str.strip())
+    
+    band = np.searchsorted(bands.starts, cand_rows, side='right') - 1
+    semester = np.array(bands.semesters, dtype=object)[band] if len(band) else np.zeros(0, dtype=object)
+    group = np.full(len(subjects), 'Unknown', dtype=object)
+    for band_index, groups in enumerate(bands.groups):
+        in_band = band == band_index
+        if len(groups) == 1:
+            group[in_band] = groups[0]
+        elif groups:
+            group_index = np.minimum((cand_cols[in_band] - 3) // 4, len(groups) - 1)
+            group[in_band] = np.where(group_index >= 0,
+                                      np.array(groups, dtype=object)[np.maximum(group_index, 0)], 'Unknown')
+    
+    subjects_lower = subjects.str.lower()
+    subject_type = np.select(
+        [(subjects_lower.str.contains('optativ', regex=False) | subjects_lower.str.contains('electiv', regex=False)).to_numpy(),
+         (subjects_lower.str.contains('tfg', regex=False) | subjects_lower.str.contains('treball final', regex=False)).to_numpy()],
+        ['Optativa', 'TFG'], default=file_info.get('tipo', 'Obligatoria'))
+    itinerari = [CELL_CLASSIFIER.itinerari(subject) for subject in subjects]
+    
+    archivo = os.path.basename(file_path)
+    return [
+        {
+            'grado': file_info.get('grado', ''),
+            'grado_code': file_info.get('grado_code', ''),
+            'curso': file_info.get('curso', ''),
+            'semestre': sem,
+            'tipo': tipo,
+            'itinerari': iti,
+            'asignatura': subject,
+            'grupo': grupo,
+            'aulas': rooms,
+            'profesor': prof if prof else None,
+            'es_placeholder': False,
+            'archivo': archivo
+        }
+        for subject, sem, tipo, iti, grupo, rooms, prof in zip(
+            subjects.tolist(), semester.tolist(), subject_type.tolist(), itinerari, group.tolist(),
+            classrooms.tolist(), professor.tolist())
+    ]
+
+EXTRACTION_BACKENDS = {
+    'openpyxl': extract_schedule_data,
+    'pandas': extract_schedule_data_vectorized,
+}
+
+def summarize_entries(entries):
+    """Count entries per degree, year and itinerari (in entry order)"""
+    summary = defaultdict(int)
+    for entry in entries:
+        summary['total_entries'] += 1
+        summary[f"grado_{entry['grado_code']}"] += 1
+        summary[f"curso_{entry['curso']}"] += 1
+        if entry['itinerari']:
+            summary[f"itinerari_{entry['itinerari']}"] += 1
+    return summary
+
+def process_workbook(filename, read_only=True, backend='openpyxl', reader='openpyxl'):
+    """Extract one workbook; runs in a worker process in parallel mode.
+    
+    Returns (filename, file_info, entries, file_summary, error) where error is
+    None on success or the formatted traceback of the failure.
+    """
+    file_info = parse_filename(filename)
+    file_path = os.path.join(EXCEL_DIR, filename)
+    
+    try:
+        data = EXTRACTION_BACKENDS[backend](file_path, file_info, read_only=read_only, reader=reader)
+    except Exception:
+        return filename, file_info, [], {}, traceback.format_exc()
+    
+    return filename, file_info, data, dict(summarize_entries(data)), None
+
 def main():
     """Main function to process all Excel files"""
+    parser = argparse.ArgumentParser(description="Extract schedule data from the Excel timetables (v2)")
+    parser.add_argument('--full-load', action='store_true',
+                        help="Load workbooks fully instead of streaming them in read-only mode")
+    parser.add_argument('--apply-corrections', action='store_true',
+                        help="Apply the csv/excel_corrections.json fixes while extracting")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes extracting workbooks in parallel (default: 1, serial)")
+    parser.add_argument('--backend', choices=sorted(EXTRACTION_BACKENDS), default='openpyxl',
+                        help="Cell-by-cell openpyxl scan or vectorised pandas/NumPy extraction (same records)")
+    parser.add_argument('--reader', choices=['openpyxl', 'ooxml'], default='openpyxl',
+                        help="Read cells through openpyxl or parse the sheet XML directly (same values)")
+    parser.add_argument('--store', default=DEFAULT_STORE_FILE,
+                        help="SQLite file keeping the per-workbook results between runs")
+    parser.add_argument('--no-store', action='store_true',
+                        help="Extract every workbook without reading or writing the store")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Discard this extractor's stored results and extract every workbook again")
+    args = parser.parse_args()
+    
+    corrections = ExcelCorrections.load() if args.apply_corrections else None
     all_data = []
     summary = defaultdict(int)
+    errors = []
     
     print("Extracting data from Excel files (v2 - Enhanced for GBA)...")
     print("=" * 80)
     
-    # Process all Excel files
-    for filename in sorted(os.listdir(EXCEL_DIR)):
-        if filename.endswith('.xlsx') and not filename.startswith('~'):
-            print(f"\nProcessing: {filename}")
-            
-            file_info = parse_filename(filename)
-            file_path = os.path.join(EXCEL_DIR, filename)
-            
-            try:
-                data = extract_schedule_data(file_path, file_info)
-                all_data.extend(data)
-                
-                print(f"  Grado: {file_info.get('grado', 'Unknown')}")
-                print(f"  Curso: {file_info.get('curso', 'Unknown')}")
-                print(f"  Entries found: {len(data)}")
-                
-                # Update summary
-                for entry in data:
-                    summary['total_entries'] += 1
-                    summary[f"grado_{entry['grado_code']}"] += 1
-                    summary[f"curso_{entry['curso']}"] += 1
-                    if entry['itinerari']:
-                        summary[f"itinerari_{entry['itinerari']}"] += 1
-                    
-            except Exception as e:
-                print(f"  ERROR: {str(e)}")
+    filenames = [filename for filename in sorted(os.listdir(EXCEL_DIR))
+                 if filename.endswith('.xlsx') and not filename.startswith('~')]
+    
+    # Unchanged workbooks are served from the store
+    store = None if args.no_store else ExtractionStore(args.store)
+    if store and args.rebuild:
+        store.clear(EXTRACTOR_NAME)
+    source_hashes = {}
+    results = {}
+    if store:
+        for filename in filenames:
+            source_hashes[filename] = store.source_hash(os.path.join(EXCEL_DIR, filename))
+            data = store.get(source_hashes[filename], filename, EXTRACTOR_NAME, EXTRACTOR_VERSION)
+            if data is not None:
+                results[filename] = (filename, parse_filename(filename), data, dict(summarize_entries(data)), None)
+    pending = [filename for filename in filenames if filename not in results]
+    read_only = [not args.full_load] * len(pending)
+    backends = [args.backend] * len(pending)
+    readers = [args.reader] * len(pending)
+    
+    # Results are merged in sorted filename order whatever the number of
+    # workers, so the output is identical to a serial run
+    if args.workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results.update(zip(pending, pool.map(process_workbook, pending, read_only, backends, readers)))
+    else:
+        results.update(zip(pending, map(process_workbook, pending, read_only, backends, readers)))
+    
+    for filename in filenames:
+        _, file_info, data, file_summary, error = results[filename]
+        print(f"\nProcessing: {filename}")
+        
+        if error:
+            print(f"  ERROR: {error.strip().splitlines()[-1]}")
+            errors.append({'file': filename, 'error': error})
+            continue
+        
+        if filename not in pending:
+            print("  Unchanged, using the stored result")
+        elif store:
+            store.put(source_hashes[filename], EXTRACTOR_NAME, EXTRACTOR_VERSION, filename, data)
+        
+        if corrections:
+            # Applied here rather than in the workers so the rule counters add up
+            data = corrections.apply(data)
+            file_summary = summarize_entries(data)
+        all_data.extend(data)
+        
+        print(f"  Grado: {file_info.get('grado', 'Unknown')}")
+        print(f"  Curso: {file_info.get('curso', 'Unknown')}")
+        print(f"  Entries found: {len(data)}")
+        
+        # Update summary
+        for key, count in file_summary.items():
+            summary[key] += count
     
     # Save to JSON
     output_data = {
@@ -383,6 +736,7 @@ def main():
         'version': 2,
         'total_files_processed': len([f for f in os.listdir(EXCEL_DIR) if f.endswith('.xlsx')]),
         'summary': dict(summary),
+        'errors': errors,
         'data': all_data
     }
     
@@ -394,6 +748,8 @@ def main():
     print("EXTRACTION SUMMARY (V2)")
     print("=" * 80)
     print(f"Total entries extracted: {summary['total_entries']}")
+    if errors:
+        print(f"Files with errors: {len(errors)} (see 'errors' in the output)")
     print(f"\nBy degree:")
     for key, value in summary.items():
         if key.startswith('grado_'):
@@ -408,6 +764,14 @@ def main():
             print(f"  {key.replace('itinerari_', '')}: {value}")
     
     print(f"\nData saved to: {OUTPUT_FILE}")
+    if store:
+        pruned = store.prune(EXTRACTOR_NAME, EXTRACTOR_VERSION,
+                             [(source_hash, filename) for filename, source_hash in source_hashes.items()])
+        print(f"Extraction store: {len(filenames) - len(pending)} workbooks reused, "
+              f"{len(pending)} extracted, {pruned} stale results dropped ({args.store})")
+        store.close()
+    if corrections:
+        corrections.report()
     
     # Show GBA entries
     gba_entries = [e for e in all_data if e['grado_code'] == 'GBA']
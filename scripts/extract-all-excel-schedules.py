@@ -10,7 +10,12 @@ import numpy as np
 import os
 import re
 import json
+import argparse
 from openpyxl import load_workbook
+from excel_cell_classifier import CellClassifier
+from excel_row_bands import RowBands
+from excel_corrections import ExcelCorrections
+from extraction_store import DEFAULT_STORE_FILE, ExtractionStore
 from openpyxl.styles import PatternFill
 from datetime import datetime
 from collections import defaultdict
@@ -19,6 +24,11 @@ from collections import defaultdict
 EXCEL_DIR = '/Users/josepmarimon/Documents/github/bau-assist/csv/excelhorari'
 OUTPUT_FILE = '/Users/josepmarimon/Documents/github/bau-assist/csv/extracted_excel_data.json'
 
+# Key of this extractor's results in the extraction store; bump the version
+# whenever a parsing change should invalidate the stored results
+EXTRACTOR_NAME = 'excel_cells_v1'
+EXTRACTOR_VERSION = '1.2'
+
 def is_white_background(cell):
     """Check if a cell has white background (placeholder)"""
     if cell.fill and cell.fill.patternType:
@@ -29,6 +39,12 @@ def is_white_background(cell):
                     return True
     return False
 
+def grid_value(grid, row, col):
+    """Value at 1-based (row, col) of a grid read with values_only, or None."""
+    if row - 1 < len(grid) and col - 1 < len(grid[row - 1]):
+        return grid[row - 1][col - 1]
+    return None
+
 def parse_filename(filename):
     """Extract metadata from filename"""
     info = {}
@@ -56,177 +72,233 @@ def parse_filename(filename):
     
     return info
 
-def extract_itinerari_from_context(ws, row, col, subject_name):
-    """Try to extract itinerari from context around the subject"""
-    itinerari = None
-    
-    # Check for specific subject patterns that indicate itinerari
-    itinerari_patterns = {
-        'Videojocs': ['Videojocs', 'Game', 'Jocs'],
-        'Animació': ['Animació', 'Animation', 'Animació Digital'],
-        'Audiovisual': ['Audiovisual', 'Vídeo', 'Cinema'],
-        'Gràfic': ['Gràfic', 'Comunicació Visual', 'Disseny Gràfic'],
-        'Moda': ['Moda', 'Fashion'],
-        'Interiors': ['Interiors', 'Espais'],
-        'Producte': ['Producte', 'Product'],
-        'Web': ['Web', 'Digital', 'Interactiu'],
-        'Tipografia': ['Tipografia', 'Type'],
-        'Fotografia': ['Fotografia', 'Photo'],
-        'Il·lustració': ['Il·lustració', 'Illustration']
-    }
+def extract_itinerari_from_context(grid, max_row, max_column, row, col, subject_name):
+    """Try to extract itinerari from context around the subject
     
+    grid holds the sheet values (see scan_worksheet); max_row/max_column are
+    its dimensions. The subject name is checked first, then the
+    nearby cells row by row; the first match wins.
+    """
     # Check subject name for itinerari keywords
-    subject_lower = subject_name.lower()
-    for iti, keywords in itinerari_patterns.items():
-        for keyword in keywords:
-            if keyword.lower() in subject_lower:
-                itinerari = iti
-                break
+    itinerari = CELL_CLASSIFIER.itinerari(subject_name)
+    if itinerari:
+        return itinerari
     
     # Look for itinerari headers in nearby cells
-    if not itinerari:
-        for r in range(max(1, row-5), min(ws.max_row, row+2)):
-            for c in range(max(1, col-2), min(ws.max_column, col+3)):
-                cell_value = ws.cell(row=r, column=c).value
-                if cell_value and isinstance(cell_value, str):
-                    for iti, keywords in itinerari_patterns.items():
-                        for keyword in keywords:
-                            if keyword.lower() in cell_value.lower():
-                                itinerari = iti
-                                break
+    for r in range(max(1, row-5), min(max_row, row+2)):
+        for c in range(max(1, col-2), min(max_column, col+3)):
+            cell_value = grid_value(grid, r, c)
+            if cell_value and isinstance(cell_value, str):
+                itinerari = CELL_CLASSIFIER.itinerari(cell_value)
+                if itinerari:
+                    return itinerari
     
-    return itinerari
+    return None
 
-def extract_schedule_data(file_path, file_info):
-    """Extract all schedule data from an Excel file"""
-    
-    wb = load_workbook(file_path, data_only=True)
-    ws = wb.active
-    
-    extracted_data = []
-    
-    # Find groups in the file
-    groups = []
-    for row in range(1, min(10, ws.max_row + 1)):
-        for col in range(1, ws.max_column + 1):
-            cell = ws.cell(row=row, column=col)
-            if cell.value and isinstance(cell.value, str):
-                value = str(cell.value).strip()
-                # Match group patterns: Gm1, Ga1, M1, A1, etc.
-                if re.match(r'^[GMAgma]\d+$', value, re.IGNORECASE):
-                    groups.append(value.upper())
+# Skip patterns that are not subjects
+SKIP_PATTERNS = [
+    'DILLUNS', 'DIMARTS', 'DIMECRES', 'DIJOUS', 'DIVENDRES',
+    'SEMESTRE', '09:00', '10:00', '11:00', '11:30', '12:00', '12:30',
+    '13:00', '13:30', '14:00', '14:30', '15:00', '15:30', '16:00',
+    '16:30', '17:00', '17:30', '18:00', '18:30', '19:00', '19:30',
+    '20:00', '20:30', 'Tutories', 'CURS', 'NaN', 'lr ', '2n ', 
+    '1r ', '3r ', '4t '
+]
+
+# Keywords that tie a subject to an itinerari; earlier entries win
+ITINERARI_KEYWORDS = {
+    'Videojocs': ['Videojocs', 'Game', 'Jocs'],
+    'Animació': ['Animació', 'Animation', 'Animació Digital'],
+    'Audiovisual': ['Audiovisual', 'Vídeo', 'Cinema'],
+    'Gràfic': ['Gràfic', 'Comunicació Visual', 'Disseny Gràfic'],
+    'Moda': ['Moda', 'Fashion'],
+    'Interiors': ['Interiors', 'Espais'],
+    'Producte': ['Producte', 'Product'],
+    'Web': ['Web', 'Digital', 'Interactiu'],
+    'Tipografia': ['Tipografia', 'Type'],
+    'Fotografia': ['Fotografia', 'Photo'],
+    'Il·lustració': ['Il·lustració', 'Illustration']
+}
+
+# Match group patterns: Gm1, Ga1, M1, A1, etc.
+GROUP_PATTERN = re.compile(r'^[GMAgma]\d+$', re.IGNORECASE)
+
+CELL_CLASSIFIER = CellClassifier(SKIP_PATTERNS, ITINERARI_KEYWORDS)
+
+def scan_worksheet(ws):
+    """Read a worksheet in a single row-streaming pass.
     
-    # Find semester information
-    semester = None
-    for row in range(1, min(15, ws.max_row + 1)):
-        for col in range(1, ws.max_column + 1):
-            cell = ws.cell(row=row, column=col)
-            if cell.value and isinstance(cell.value, str):
-                value = str(cell.value).strip().lower()
-                if '1r semestre' in value or 'primer semestre' in value:
-                    semester = 1
-                elif '2n semestre' in value or 'segon semestre' in value:
-                    semester = 2
+    Keeps only what the extraction needs: the grid of cell values (for the
+    next-row and itinerari lookups), the group and semester headers of each
+    band of rows (see RowBands) and the subject candidates of rows 5+. Fills
+    are only looked up for candidate cells. Works on full and read-only
+    worksheets (whose padding cells carry no coordinates, hence the
+    enumerate).
+    """
+    grid = []
+    bands = RowBands()
+    candidates = []
     
-    # Extract courses with details
-    for row in range(5, ws.max_row + 1):
-        for col in range(1, ws.max_column + 1):
-            cell = ws.cell(row=row, column=col)
+    for row, row_cells in enumerate(ws.iter_rows(values_only=False), start=1):
+        values = []
+        
+        for col, cell in enumerate(row_cells, start=1):
+            raw = cell.value
+            values.append(raw)
             
-            # Skip if cell is empty or too short
-            if not cell.value or not isinstance(cell.value, str) or len(str(cell.value).strip()) < 3:
+            if not raw or not isinstance(raw, str):
+                continue
+            value = raw.strip()
+            
+            # A group code is a header, never a subject
+            if GROUP_PATTERN.match(value):
+                bands.add_group(row, value.upper())
                 continue
-                
-            value = str(cell.value).strip()
             
-            # Skip patterns that are not subjects
-            skip_patterns = [
-                'DILLUNS', 'DIMARTS', 'DIMECRES', 'DIJOUS', 'DIVENDRES',
-                'SEMESTRE', '09:00', '10:00', '11:00', '11:30', '12:00', '12:30',
-                '13:00', '13:30', '14:00', '14:30', '15:00', '15:30', '16:00',
-                '16:30', '17:00', '17:30', '18:00', '18:30', '19:00', '19:30',
-                '20:00', '20:30', 'Tutories', 'CURS', 'NaN', 'lr ', '2n ', 
-                '1r ', '3r ', '4t '
-            ]
+            value_lower = value.lower()
+            if '1r semestre' in value_lower or 'primer semestre' in value_lower:
+                bands.add_semester(row, 1)
+            elif '2n semestre' in value_lower or 'segon semestre' in value_lower:
+                bands.add_semester(row, 2)
             
-            if any(pattern in value for pattern in skip_patterns):
+            # Skip if cell is too short or not a subject
+            if row < 5 or len(value) < 3:
                 continue
-                
-            # Skip if it's just a group code
-            if re.match(r'^[GMAgma]\d+$', value, re.IGNORECASE):
+            if CELL_CLASSIFIER.is_skipped(value):
                 continue
             
             # Check if it's a placeholder (white background)
-            is_placeholder = is_white_background(cell)
+            candidates.append((row, col, value, is_white_background(cell)))
+            bands.add_candidate(row)
+        
+        grid.append(values)
+    
+    # ws.max_row/max_column come from the <dimension> tag in read-only mode,
+    # which may be missing or stale; the grid holds every row actually read
+    return {
+        'grid': grid,
+        'max_row': len(grid),
+        'max_column': max((len(values) for values in grid), default=0),
+        'bands': bands.finish(),
+        'candidates': candidates,
+    }
+
+def extract_schedule_data(file_path, file_info, read_only=True):
+    """Extract all schedule data from the visible sheets of an Excel file
+    
+    The workbook is opened once; read_only=True streams each sheet instead of
+    materialising every cell and style object.
+    """
+    wb = load_workbook(file_path, data_only=True, read_only=read_only)
+    try:
+        scans = [scan_worksheet(ws) for ws in wb.worksheets if ws.sheet_state == 'visible']
+    finally:
+        wb.close()
+    
+    extracted_data = []
+    for scan in scans:
+        extracted_data.extend(extract_sheet_data(file_path, file_info, scan))
+    return extracted_data
+
+def extract_sheet_data(file_path, file_info, scan):
+    """Extract the schedule entries of one sheet read by scan_worksheet"""
+    extracted_data = []
+    grid = scan['grid']
+    max_row = scan['max_row']
+    bands = scan['bands']
+    
+    # Extract courses with details
+    for row, col, value, is_placeholder in scan['candidates']:
+        # Look for professor/classroom info in the next row
+        next_cell_value = grid_value(grid, row + 1, col) if row < max_row else None
+        
+        if next_cell_value:
+            next_value = str(next_cell_value).strip()
             
-            # Look for professor/classroom info in the next row
-            next_cell = ws.cell(row=row+1, column=col) if row < ws.max_row else None
+            # Extract classrooms
+            classrooms = re.findall(r'[PGLC][0-9]\.[0-9]+(?:/[0-9]+)?', next_value)
             
-            if next_cell and next_cell.value:
-                next_value = str(next_cell.value).strip()
+            # Also check for special room patterns
+            special_rooms = re.findall(r'(?:Platós|Sala\s+\w+|Lab\s+\w+)', next_value)
+            classrooms.extend(special_rooms)
+            
+            if classrooms or len(next_value) > 2:
+                # Remove classroom info to get professor name
+                professor = next_value
+                for classroom in classrooms:
+                    professor = professor.replace(classroom, '')
                 
-                # Extract classrooms
-                classrooms = re.findall(r'[PGLC][0-9]\.[0-9]+(?:/[0-9]+)?', next_value)
+                # Clean up professor name
+                professor = re.sub(r'\s+', ' ', professor).strip()
+                professor = professor.replace('+', ' ').strip()
                 
-                # Also check for special room patterns
-                special_rooms = re.findall(r'(?:Platós|Sala\s+\w+|Lab\s+\w+)', next_value)
-                classrooms.extend(special_rooms)
+                # Semester and groups of the timetable block holding the subject
+                semester, groups = bands.context(row)
                 
-                if classrooms or len(next_value) > 2:
-                    # Remove classroom info to get professor name
-                    professor = next_value
-                    for classroom in classrooms:
-                        professor = professor.replace(classroom, '')
-                    
-                    # Clean up professor name
-                    professor = re.sub(r'\s+', ' ', professor).strip()
-                    professor = professor.replace('+', ' ').strip()
-                    
-                    # Determine group assignment
-                    group = None
-                    if groups:
-                        # Use column position to estimate group
-                        if len(groups) == 1:
-                            group = groups[0]
-                        else:
-                            # Estimate based on column position
-                            group_index = min((col - 3) // 4, len(groups) - 1)
-                            if group_index >= 0 and group_index < len(groups):
-                                group = groups[group_index]
-                    
-                    # Extract itinerari
-                    itinerari = extract_itinerari_from_context(ws, row, col, value)
-                    
-                    # Determine subject type
-                    subject_type = file_info.get('tipo', 'Obligatoria')
-                    if 'optativ' in value.lower() or 'electiv' in value.lower():
-                        subject_type = 'Optativa'
-                    elif 'tfg' in value.lower() or 'treball final' in value.lower():
-                        subject_type = 'TFG'
-                    
-                    course_data = {
-                        'grado': file_info.get('grado', ''),
-                        'grado_code': file_info.get('grado_code', ''),
-                        'curso': file_info.get('curso', ''),
-                        'semestre': semester,
-                        'tipo': subject_type,
-                        'itinerari': itinerari,
-                        'asignatura': value,
-                        'grupo': group or 'Unknown',
-                        'aulas': classrooms,
-                        'profesor': professor if professor else None,
-                        'es_placeholder': is_placeholder,
-                        'archivo': os.path.basename(file_path)
-                    }
-                    
-                    # Only add if not a placeholder
-                    if not is_placeholder:
-                        extracted_data.append(course_data)
+                # Determine group assignment
+                group = None
+                if groups:
+                    # Use column position to estimate group
+                    if len(groups) == 1:
+                        group = groups[0]
+                    else:
+                        # Estimate based on column position
+                        group_index = min((col - 3) // 4, len(groups) - 1)
+                        if group_index >= 0 and group_index < len(groups):
+                            group = groups[group_index]
+                
+                # Extract itinerari
+                itinerari = extract_itinerari_from_context(grid, max_row, scan['max_column'],
+                                                           row, col, value)
+                
+                # Determine subject type
+                subject_type = file_info.get('tipo', 'Obligatoria')
+                if 'optativ' in value.lower() or 'electiv' in value.lower():
+                    subject_type = 'Optativa'
+                elif 'tfg' in value.lower() or 'treball final' in value.lower():
+                    subject_type = 'TFG'
+                
+                course_data = {
+                    'grado': file_info.get('grado', ''),
+                    'grado_code': file_info.get('grado_code', ''),
+                    'curso': file_info.get('curso', ''),
+                    'semestre': semester,
+                    'tipo': subject_type,
+                    'itinerari': itinerari,
+                    'asignatura': value,
+                    'grupo': group or 'Unknown',
+                    'aulas': classrooms,
+                    'profesor': professor if professor else None,
+                    'es_placeholder': is_placeholder,
+                    'archivo': os.path.basename(file_path)
+                }
+                
+                # Only add if not a placeholder
+                if not is_placeholder:
+                    extracted_data.append(course_data)
     
     return extracted_data
 
 def main():
     """Main function to process all Excel files"""
+    parser = argparse.ArgumentParser(description="Extract schedule data from the Excel timetables")
+    parser.add_argument('--full-load', action='store_true',
+                        help="Load workbooks fully instead of streaming them in read-only mode")
+    parser.add_argument('--apply-corrections', action='store_true',
+                        help="Apply the csv/excel_corrections.json fixes while extracting")
+    parser.add_argument('--store', default=DEFAULT_STORE_FILE,
+                        help="SQLite file keeping the per-workbook results between runs")
+    parser.add_argument('--no-store', action='store_true',
+                        help="Extract every workbook without reading or writing the store")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Discard this extractor's stored results and extract every workbook again")
+    args = parser.parse_args()
+    
+    corrections = ExcelCorrections.load() if args.apply_corrections else None
+    store = None if args.no_store else ExtractionStore(args.store)
+    if store and args.rebuild:
+        store.clear(EXTRACTOR_NAME)
+    sources = []
     all_data = []
     summary = defaultdict(int)
     
@@ -242,7 +314,20 @@ def main():
             file_path = os.path.join(EXCEL_DIR, filename)
             
             try:
-                data = extract_schedule_data(file_path, file_info)
+                # Unchanged workbooks are served from the store
+                data = None
+                if store:
+                    source_hash = store.source_hash(file_path)
+                    sources.append((source_hash, filename))
+                    data = store.get(source_hash, filename, EXTRACTOR_NAME, EXTRACTOR_VERSION)
+                    if data is not None:
+                        print("  Unchanged, using the stored result")
+                if data is None:
+                    data = extract_schedule_data(file_path, file_info, read_only=not args.full_load)
+                    if store:
+                        store.put(source_hash, EXTRACTOR_NAME, EXTRACTOR_VERSION, filename, data)
+                if corrections:
+                    data = corrections.apply(data)
                 all_data.extend(data)
                 
                 print(f"  Grado: {file_info.get('grado', 'Unknown')}")
@@ -290,6 +375,13 @@ def main():
             print(f"  {key.replace('itinerari_', '')}: {value}")
     
     print(f"\nData saved to: {OUTPUT_FILE}")
+    if store:
+        pruned = store.prune(EXTRACTOR_NAME, EXTRACTOR_VERSION, sources)
+        print(f"Extraction store: {store.hits} workbooks reused, {store.misses} extracted, "
+              f"{pruned} stale results dropped ({args.store})")
+        store.close()
+    if corrections:
+        corrections.report()
     
     # Show sample entries
     print("\nSample entries (first 3):")
@@ -9,108 +9,281 @@ import xml.etree.ElementTree as ET
 import os
 import re
 import json
+import argparse
 from datetime import datetime
 from collections import defaultdict
 
+import xlsx_fast_reader
+from extraction_store import DEFAULT_STORE_FILE, ExtractionStore
+from shape_text_repair import ShapeTextRepair
+
+# Key of this extractor's results in the extraction store; bump the version
+# whenever a parsing change should invalidate the stored results
+EXTRACTOR_NAME = 'gba_drawings'
+EXTRACTOR_VERSION = '1.5'
+
 def extract_shapes_with_details(file_path):
     """Extract all shapes with text, position, and formatting details"""
     
-    shapes = []
-    
     with zipfile.ZipFile(file_path, 'r') as zip_file:
-        if 'xl/drawings/drawing1.xml' in zip_file.namelist():
-            with zip_file.open('xl/drawings/drawing1.xml') as drawing_file:
-                content = drawing_file.read().decode('utf-8')
-                root = ET.fromstring(content)
-                
-                namespaces = {
-                    'xdr': 'http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing',
-                    'a': 'http://schemas.openxmlformats.org/drawingml/2006/main'
-                }
-                
-                # Process each two-cell anchor (shape container)
-                for anchor in root.findall('.//xdr:twoCellAnchor', namespaces):
-                    # Get position
-                    from_elem = anchor.find('xdr:from', namespaces)
-                    to_elem = anchor.find('xdr:to', namespaces)
-                    
-                    if from_elem is not None:
-                        from_col = int(from_elem.find('xdr:col', namespaces).text) if from_elem.find('xdr:col', namespaces) is not None else 0
-                        from_row = int(from_elem.find('xdr:row', namespaces).text) if from_elem.find('xdr:row', namespaces) is not None else 0
-                    else:
-                        from_col, from_row = 0, 0
-                    
-                    if to_elem is not None:
-                        to_col = int(to_elem.find('xdr:col', namespaces).text) if to_elem.find('xdr:col', namespaces) is not None else 0
-                        to_row = int(to_elem.find('xdr:row', namespaces).text) if to_elem.find('xdr:row', namespaces) is not None else 0
-                    else:
-                        to_col, to_row = from_col, from_row
-                    
-                    # Get shape and its text
-                    shape_elem = anchor.find('.//xdr:sp', namespaces)
-                    if shape_elem is not None:
-                        # Extract all text runs
-                        text_runs = []
-                        for paragraph in shape_elem.findall('.//a:p', namespaces):
-                            para_text = []
-                            for run in paragraph.findall('.//a:r', namespaces):
-                                text_elem = run.find('a:t', namespaces)
-                                if text_elem is not None and text_elem.text:
-                                    para_text.append(text_elem.text)
-                            if para_text:
-                                text_runs.append(''.join(para_text))
-                        
-                        if text_runs:
-                            # Join with spaces where appropriate
-                            full_text = ' '.join(text_runs)
-                            
-                            # Fix common text issues
-                            full_text = re.sub(r'([a-z])([A-Z])', r'\1 \2', full_text)  # Add space between camelCase
-                            full_text = re.sub(r'(\d)([A-Za-z])', r'\1 \2', full_text)  # Add space between numbers and letters
-                            full_text = re.sub(r'([a-z])(\d)', r'\1 \2', full_text)  # Add space between letters and numbers
-                            full_text = re.sub(r'\s+', ' ', full_text).strip()  # Normalize spaces
-                            
-                            shapes.append({
-                                'text': full_text,
-                                'from_row': from_row,
-                                'from_col': from_col,
-                                'to_row': to_row,
-                                'to_col': to_col,
-                                'width': to_col - from_col,
-                                'height': to_row - from_row
-                            })
+        return extract_shapes_from_zip(zip_file)
+
+XDR_NS = '{http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing}'
+A_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+ANCHOR_TAGS = {XDR_NS + 'twoCellAnchor', XDR_NS + 'oneCellAnchor', XDR_NS + 'absoluteAnchor'}
+# Shape transforms are (dx, dy, sx, sy): x -> dx + x * sx, y -> dy + y * sy
+IDENTITY = (0, 0, 1, 1)
+
+def extract_shapes_from_zip(zip_file):
+    """Extract the shapes of every sheet's drawings from an already open .xlsx ZipFile"""
     
+    shapes = []
+    for sheet_name, sheet_path, drawing_path in xlsx_fast_reader.iter_zip_drawings(zip_file):
+        geometry = xlsx_fast_reader.read_sheet_geometry(zip_file, sheet_path)
+        with zip_file.open(drawing_path) as drawing_file:
+            shapes.extend(iter_drawing_shapes(drawing_file, sheet_name, geometry))
     return shapes
 
+def anchor_marker(marker):
+    """(col, col offset, row, row offset) of an xdr:from/xdr:to marker element"""
+    values = {'col': 0, 'colOff': 0, 'row': 0, 'rowOff': 0}
+    for child in marker:
+        name = child.tag[len(XDR_NS):]
+        if name in values:
+            values[name] = int(child.text)
+    return values['col'], values['colOff'], values['row'], values['rowOff']
+
+def shape_text(shape_elem, text_repair):
+    """Text of an xdr:sp, one paragraph per space-separated chunk, or None
+    
+    Glued words, accents and misread characters are repaired against the
+    subject dictionary (see shape_text_repair.py).
+    """
+    text_runs = []
+    for paragraph in shape_elem.iter(A_NS + 'p'):
+        para_text = [run.findtext(A_NS + 't') for run in paragraph.iter(A_NS + 'r')]
+        para_text = [text for text in para_text if text]
+        if para_text:
+            text_runs.append(''.join(para_text))
+    
+    if not text_runs:
+        return None
+    
+    # Join with spaces where appropriate
+    return text_repair.repair(' '.join(text_runs)) or None
+
+def read_xfrm(properties):
+    """(x, y, cx, cy, child x, child y, child cx, child cy) of the a:xfrm in spPr/grpSpPr, or None
+    
+    The child box is only set for groups and equals the box otherwise.
+    """
+    xfrm = properties.find(A_NS + 'xfrm') if properties is not None else None
+    if xfrm is None:
+        return None
+    off, ext = xfrm.find(A_NS + 'off'), xfrm.find(A_NS + 'ext')
+    if off is None or ext is None:
+        return None
+    box = (int(off.get('x')), int(off.get('y')), int(ext.get('cx')), int(ext.get('cy')))
+    ch_off, ch_ext = xfrm.find(A_NS + 'chOff'), xfrm.find(A_NS + 'chExt')
+    if ch_off is None or ch_ext is None:
+        return box + box
+    return box + (int(ch_off.get('x')), int(ch_off.get('y')), int(ch_ext.get('cx')), int(ch_ext.get('cy')))
+
+def box_transform(source, target):
+    """Transform (dx, dy, sx, sy) mapping the (x, y, cx, cy) box source onto target"""
+    sx = target[2] / source[2] if source[2] else 1
+    sy = target[3] / source[3] if source[3] else 1
+    return target[0] - source[0] * sx, target[1] - source[1] * sy, sx, sy
+
+def compose(outer, inner):
+    """Transform applying inner first and then outer"""
+    dx, dy, sx, sy = outer
+    return dx + inner[0] * sx, dy + inner[1] * sy, inner[2] * sx, inner[3] * sy
+
+def apply_transform(transform, box):
+    """Map an (x, y, cx, cy) box through a transform, in whole EMU"""
+    dx, dy, sx, sy = transform
+    return (round(dx + box[0] * sx), round(dy + box[1] * sy), round(box[2] * sx), round(box[3] * sy))
+
+def iter_drawing_shapes(drawing_file, sheet_name=None, geometry=None, text_repair=None):
+    """Stream the text shapes of one drawing part.
+    
+    Yields one record per shape with text: the shape of each anchor, or
+    every shape of its (nested) xdr:grpSp. Group children are placed in
+    sheet coordinates by applying the chOff/chExt -> off/ext transform of
+    every enclosing group, and the top-level object is fitted to its
+    anchor, so 'x', 'y', 'cx', 'cy' are absolute EMU rectangles.
+    With the sheet's geometry (xlsx_fast_reader.read_sheet_geometry) the
+    anchors are measured and the cell range of every shape comes from its
+    own rectangle; without it the xfrm offsets are taken as absolute and
+    every shape gets the cells of its anchor. Rotation and flips are ignored.
+    
+    Shapes are read as their end tag arrives and every anchor is dropped
+    once done, so memory does not grow with the number of shapes. The
+    mc:Fallback copies of alternate-content shapes are skipped. Texts go
+    through text_repair, by default the process-wide ShapeTextRepair.
+    """
+    if text_repair is None:
+        text_repair = ShapeTextRepair.shared()
+    root = None
+    from_marker = to_marker = position = extent = anchor_box = None
+    # Transforms from each open group's child space to sheet EMU
+    groups = []
+    fallback_depth = 0
+    
+    for event, element in ET.iterparse(drawing_file, events=('start', 'end')):
+        tag = element.tag
+        if event == 'start':
+            if root is None:
+                root = element
+            elif tag == MC_FALLBACK:
+                fallback_depth += 1
+            continue
+        
+        if tag == MC_FALLBACK:
+            fallback_depth -= 1
+        elif tag == XDR_NS + 'from':
+            from_marker = anchor_marker(element)
+        elif tag == XDR_NS + 'to':
+            to_marker = anchor_marker(element)
+        elif tag == XDR_NS + 'pos':
+            position = (int(element.get('x')), int(element.get('y')))
+        elif tag == XDR_NS + 'ext':
+            extent = (int(element.get('cx')), int(element.get('cy')))
+        elif tag == XDR_NS + 'grpSpPr':
+            if anchor_box is None:
+                anchor_box = measure_anchor(geometry, from_marker, to_marker, position, extent)
+            xfrm = read_xfrm(element)
+            parent = groups[-1] if groups else IDENTITY
+            if xfrm is not None:
+                if not groups and anchor_box is not None:
+                    parent = box_transform(xfrm[:4], anchor_box)
+                parent = compose(parent, box_transform(xfrm[4:], xfrm[:4]))
+            groups.append(parent)
+        elif tag == XDR_NS + 'grpSp':
+            groups.pop()
+            element.clear()
+        elif tag == XDR_NS + 'sp' and not fallback_depth:
+            if anchor_box is None:
+                anchor_box = measure_anchor(geometry, from_marker, to_marker, position, extent)
+            xfrm = read_xfrm(element.find(XDR_NS + 'spPr'))
+            full_text = shape_text(element, text_repair)
+            element.clear()
+            if groups:
+                box = apply_transform(groups[-1], xfrm[:4]) if xfrm is not None else anchor_box
+            else:
+                box = anchor_box or (xfrm[:4] if xfrm is not None else None)
+            
+            if not full_text:
+                continue
+            if geometry is not None and box is not None:
+                from_col, from_row = geometry.col_at(box[0]), geometry.row_at(box[1])
+                to_col, to_row = geometry.col_at(box[0] + box[2]), geometry.row_at(box[1] + box[3])
+            elif from_marker is not None:
+                from_col, _, from_row, _ = from_marker
+                to_col, _, to_row, _ = to_marker or from_marker
+            else:
+                continue
+            x, y, cx, cy = box or (None, None, None, None)
+            yield {
+                'text': full_text,
+                'sheet': sheet_name,
+                'from_row': from_row,
+                'from_col': from_col,
+                'to_row': to_row,
+                'to_col': to_col,
+                'width': to_col - from_col,
+                'height': to_row - from_row,
+                'x': x,
+                'y': y,
+                'cx': cx,
+                'cy': cy
+            }
+        elif tag in ANCHOR_TAGS:
+            from_marker = to_marker = position = extent = anchor_box = None
+            groups = []
+            root.clear()
+
+def measure_anchor(geometry, from_marker, to_marker, position, extent):
+    """(x, y, cx, cy) in EMU of the current anchor, or None without the sheet geometry"""
+    if position is not None and extent is not None:
+        return position + extent
+    if geometry is None or from_marker is None:
+        return None
+    x, y = geometry.point(*from_marker)
+    if to_marker is not None:
+        x2, y2 = geometry.point(*to_marker)
+        return x, y, x2 - x, y2 - y
+    if extent is not None:
+        return (x, y) + extent
+    return None
+
 def group_shapes_by_position(shapes):
-    """Group shapes that are likely to be related based on position"""
+    """Sort shapes by position and group their indexes by row bucket (2 rows each)"""
     
     # Sort by row first, then column
     shapes.sort(key=lambda x: (x['from_row'], x['from_col']))
     
     # Group by approximate row position
     row_groups = defaultdict(list)
-    for shape in shapes:
+    for index, shape in enumerate(shapes):
         # Use a row bucket (group shapes within 2 rows of each other)
         row_bucket = shape['from_row'] // 2
-        row_groups[row_bucket].append(shape)
+        row_groups[row_bucket].append(index)
     
     return row_groups
 
+class SubjectGrid:
+    """Uniform grid index over the anchors of a sheet's subject shapes.
+    
+    Subjects are bucketed by anchor row and by blocks of GRID_COLS columns,
+    so the subjects next to a shape are found by looking at a few buckets
+    instead of at every shape of the sheet.
+    """
+    
+    GRID_COLS = 8
+    
+    def __init__(self, subjects):
+        self.subjects = subjects
+        self.buckets = defaultdict(list)
+        for index, subject in enumerate(subjects):
+            self.buckets[subject['from_row'], subject['from_col'] // self.GRID_COLS].append(index)
+    
+    def nearest_left(self, shape, row_reach=1):
+        """Return (rank, subject index) of the closest subject left of shape, or None.
+        
+        Only subjects anchored within row_reach rows of the shape count, so a
+        professor or classroom one row below its subject is still found.
+        Ranks order same-row subjects first, then subjects above before
+        subjects below, then the column gap between the two anchors.
+        """
+        best = None
+        for row in range(shape['from_row'] - row_reach, shape['from_row'] + row_reach + 1):
+            for block in range(shape['from_col'] // self.GRID_COLS + 1):
+                for index in self.buckets.get((row, block), ()):
+                    subject = self.subjects[index]
+                    if subject['from_col'] >= shape['from_col']:
+                        continue
+                    row_gap = shape['from_row'] - subject['from_row']
+                    rank = (abs(row_gap), row_gap < 0, max(shape['from_col'] - subject['to_col'], 0), index)
+                    if best is None or rank < best[0]:
+                        best = (rank, index)
+        return best
+
+TIME_PATTERN = re.compile(r'^\d{1,2}:\d{2}')
+CLASSROOM_PATTERN = re.compile(r'[PGLC]\d+\.\d+')
+DAY_PATTERN = re.compile(r'(DILLUNS|DIMARTS|DIMECRES|DIJOUS|DIVENDRES)')
+
 def identify_shape_type(text):
     """Identify what type of content a shape contains"""
     
-    # Patterns
-    time_pattern = re.compile(r'^\d{1,2}:\d{2}')
-    classroom_pattern = re.compile(r'[PGLC]\d+\.\d+')
-    day_pattern = re.compile(r'(DILLUNS|DIMARTS|DIMECRES|DIJOUS|DIVENDRES)')
-    
     # Classifications
-    if time_pattern.match(text):
+    if TIME_PATTERN.match(text):
         return 'time'
-    elif day_pattern.search(text):
+    elif DAY_PATTERN.search(text):
         return 'day'
-    elif classroom_pattern.search(text) and len(text) < 20:
+    elif CLASSROOM_PATTERN.search(text) and len(text) < 20:
         return 'classroom'
     elif text in ['tutories', 'Tutories', 'CURS', 'GRAU EN BELLES ARTS', 'GRAU EN BELLESARTS']:
         return 'header'
@@ -186,10 +359,16 @@ def parse_multi_subject_text(text):
     return subjects
 
 def extract_schedule_from_shapes(shapes, filename):
-    """Extract schedule data from shapes with improved logic"""
+    """Extract schedule data from shapes with improved logic
+    
+    Each sheet has its own layout, so the shapes of every sheet are grouped
+    into rows and read on their own, sheet by sheet.
+    """
     
     schedule_data = []
-    row_groups = group_shapes_by_position(shapes)
+    shapes_by_sheet = defaultdict(list)
+    for shape in shapes:
+        shapes_by_sheet[shape.get('sheet')].append(shape)
     
     # Parse filename for metadata
     curso = None
@@ -202,82 +381,114 @@ def extract_schedule_from_shapes(shapes, filename):
     elif '_4t_' in filename:
         curso = '4t'
     
-    current_semester = None
-    
-    # Process each row group
-    for row_bucket in sorted(row_groups.keys()):
-        shapes_in_row = row_groups[row_bucket]
-        
-        # Classify shapes in this row
-        classified = defaultdict(list)
-        for shape in shapes_in_row:
-            shape_type = identify_shape_type(shape['text'])
-            classified[shape_type].append(shape)
+    for sheet_shapes in shapes_by_sheet.values():
+        row_groups = group_shapes_by_position(sheet_shapes)
+        shape_types = [identify_shape_type(shape['text']) for shape in sheet_shapes]
         
-        # Update semester if found
-        for semester_shape in classified['semester']:
-            if '1r semestre' in semester_shape['text'].lower():
-                current_semester = 1
-            elif '2n semestre' in semester_shape['text'].lower():
-                current_semester = 2
+        # Each professor/classroom shape belongs to the nearest subject on its
+        # left; a subject keeps the closest shape of each kind it is given
+        subjects = [index for index, shape_type in enumerate(shape_types) if shape_type == 'subject']
+        grid = SubjectGrid([sheet_shapes[index] for index in subjects])
+        associated = defaultdict(dict)
+        for index, shape_type in enumerate(shape_types):
+            if shape_type not in ('professor', 'classroom'):
+                continue
+            nearest = grid.nearest_left(sheet_shapes[index])
+            if nearest is None:
+                continue
+            rank, subject = nearest
+            closest = associated[subjects[subject]].get(shape_type)
+            if closest is None or rank < closest[0]:
+                associated[subjects[subject]][shape_type] = (rank, sheet_shapes[index])
         
-        # Process multi-subject shapes
-        for multi_shape in classified['multi_subject']:
-            subjects = parse_multi_subject_text(multi_shape['text'])
-            for subj in subjects:
-                if subj['name'] and 'Optativitat' not in subj['name']:
-                    entry = {
-                        'asignatura': subj['name'],
-                        'grado': 'Belles Arts',
-                        'grado_code': 'GBA',
-                        'curso': curso,
-                        'semestre': current_semester,
-                        'tipo': 'Obligatoria',
-                        'profesor': subj['professor'],
-                        'aulas': subj['classrooms'],
-                        'archivo': filename
-                    }
-                    schedule_data.append(entry)
+        current_semester = None
         
-        # Process single subjects
-        for subject_shape in classified['subject']:
-            subject_name = subject_shape['text']
-            
-            # Skip if it's just "Optativitat"
-            if subject_name == 'Optativitat':
-                continue
+        # Process each row group
+        for row_bucket in sorted(row_groups.keys()):
+            # Shapes of this row by type
+            classified = defaultdict(list)
+            for index in row_groups[row_bucket]:
+                classified[shape_types[index]].append(index)
             
-            # Look for associated professor/classroom
-            professor = None
-            classrooms = []
+            # Update semester if found
+            for index in classified['semester']:
+                semester_text = sheet_shapes[index]['text'].lower()
+                if '1r semestre' in semester_text:
+                    current_semester = 1
+                elif '2n semestre' in semester_text:
+                    current_semester = 2
             
-            # Check shapes in same row that come after this subject
-            subject_col = subject_shape['from_col']
-            for other_shape in shapes_in_row:
-                if other_shape['from_col'] > subject_col:
-                    other_type = identify_shape_type(other_shape['text'])
-                    if other_type == 'professor':
-                        professor = other_shape['text']
-                    elif other_type == 'classroom':
-                        classrooms = re.findall(r'[PGLC]\d+\.\d+', other_shape['text'])
+            # Process multi-subject shapes
+            for index in classified['multi_subject']:
+                for subj in parse_multi_subject_text(sheet_shapes[index]['text']):
+                    if subj['name'] and 'Optativitat' not in subj['name']:
+                        entry = {
+                            'asignatura': subj['name'],
+                            'grado': 'Belles Arts',
+                            'grado_code': 'GBA',
+                            'curso': curso,
+                            'semestre': current_semester,
+                            'tipo': 'Obligatoria',
+                            'profesor': subj['professor'],
+                            'aulas': subj['classrooms'],
+                            'archivo': filename
+                        }
+                        schedule_data.append(entry)
             
-            entry = {
-                'asignatura': subject_name,
-                'grado': 'Belles Arts',
-                'grado_code': 'GBA',
-                'curso': curso,
-                'semestre': current_semester,
-                'tipo': 'Obligatoria',
-                'profesor': professor,
-                'aulas': classrooms,
-                'archivo': filename
-            }
-            schedule_data.append(entry)
+            # Process single subjects
+            for index in classified['subject']:
+                subject_name = sheet_shapes[index]['text']
+                
+                # Skip if it's just "Optativitat"
+                if subject_name == 'Optativitat':
+                    continue
+                
+                # Associated professor/classroom
+                professor = None
+                classrooms = []
+                if 'professor' in associated[index]:
+                    professor = associated[index]['professor'][1]['text']
+                if 'classroom' in associated[index]:
+                    classrooms = CLASSROOM_PATTERN.findall(associated[index]['classroom'][1]['text'])
+                
+                entry = {
+                    'asignatura': subject_name,
+                    'grado': 'Belles Arts',
+                    'grado_code': 'GBA',
+                    'curso': curso,
+                    'semestre': current_semester,
+                    'tipo': 'Obligatoria',
+                    'profesor': professor,
+                    'aulas': classrooms,
+                    'archivo': filename
+                }
+                schedule_data.append(entry)
     
     return schedule_data
 
+def deduplicate_entries(schedule_data):
+    """Keep the first entry of each subject and semester"""
+    unique_subjects = {}
+    for entry in schedule_data:
+        key = f"{entry['asignatura']}_{entry['semestre']}"
+        if key not in unique_subjects:
+            unique_subjects[key] = entry
+    return list(unique_subjects.values())
+
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="Extract GBA schedules from the drawing objects of the Excel files")
+    parser.add_argument('--store', default=DEFAULT_STORE_FILE,
+                        help="SQLite file keeping the per-workbook results between runs")
+    parser.add_argument('--no-store', action='store_true',
+                        help="Extract every workbook without reading or writing the store")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Discard this extractor's stored results and extract every workbook again")
+    args = parser.parse_args()
+    
+    store = None if args.no_store else ExtractionStore(args.store)
+    if store and args.rebuild:
+        store.clear(EXTRACTOR_NAME)
     
     excel_dir = '/Users/josepmarimon/Documents/github/bau-assist/csv/excelhorari'
     output_file = '/Users/josepmarimon/Documents/github/bau-assist/csv/extracted_gba_schedules_improved.json'
@@ -295,22 +506,27 @@ def main():
         print(f"\nProcessing: {filename}")
         
         try:
-            # Extract shapes
-            shapes = extract_shapes_with_details(file_path)
-            print(f"  Found {len(shapes)} shapes")
-            
-            # Parse schedule data
-            schedule_data = extract_schedule_from_shapes(shapes, filename)
+            # Unchanged workbooks are served from the store
+            schedule_data = None
+            if store:
+                source_hash = store.source_hash(file_path)
+                schedule_data = store.get(source_hash, filename, EXTRACTOR_NAME, EXTRACTOR_VERSION)
+                if schedule_data is not None:
+                    print(f"  Unchanged, using the stored {len(schedule_data)} entries")
             
-            # Remove duplicates
-            unique_subjects = {}
-            for entry in schedule_data:
-                key = f"{entry['asignatura']}_{entry['semestre']}"
-                if key not in unique_subjects:
-                    unique_subjects[key] = entry
-            
-            schedule_data = list(unique_subjects.values())
-            print(f"  Extracted {len(schedule_data)} unique schedule entries")
+            if schedule_data is None:
+                # Extract shapes
+                shapes = extract_shapes_with_details(file_path)
+                print(f"  Found {len(shapes)} shapes")
+                
+                # Parse schedule data
+                schedule_data = extract_schedule_from_shapes(shapes, filename)
+                
+                # Remove duplicates
+                schedule_data = deduplicate_entries(schedule_data)
+                print(f"  Extracted {len(schedule_data)} unique schedule entries")
+                if store:
+                    store.put(source_hash, EXTRACTOR_NAME, EXTRACTOR_VERSION, filename, schedule_data)
             
             all_schedules.extend(schedule_data)
             
@@ -343,6 +559,11 @@ def main():
     print(f"\n{'='*80}")
     print(f"Total GBA schedule entries extracted: {len(all_schedules)}")
     print(f"Data saved to: {output_file}")
+    if store:
+        print(f"Extraction store: {store.hits} workbooks reused, {store.misses} extracted ({args.store})")
+        store.close()
+    text_repair = ShapeTextRepair.shared()
+    print(f"Shape text repair: {text_repair.misses} distinct texts repaired, {text_repair.hits} repeats reused")
     
     # Summary by course
     by_course = defaultdict(int)
@@ -4,22 +4,308 @@ Extract schedule data from PDF files for BAU university courses - Version 3.
 Improved parser to handle multi-line cells and complete subject names.
 """
 
+import argparse
+import bisect
+import cProfile
+import functools
+import hashlib
+import inspect
 import json
+import os
+import sys
 import pdfplumber
 import pandas as pd
+from pdfplumber.utils import cluster_objects
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 import re
 from datetime import datetime
 import logging
+import tempfile
+import time
+import traceback
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _file_sha256(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(data, output_path: str):
+    """Write JSON to a temp file next to output_path and rename it into place.
+    
+    Readers (e.g. the Next.js app) see either the old or the new file, never a
+    half-written one. mkstemp creates the temp file owner-only, so it gets
+    the mode of the file it replaces, or the umask default for a new file,
+    before the rename.
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    try:
+        mode = os.stat(output_path).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class ExtractionCache:
+    """On-disk cache of per-PDF schedule lists, keyed by PDF content and extractor config."""
+    
+    def __init__(self, cache_dir: str, max_bytes: int = 64 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        
+    def key(self, pdf_path: Path, fingerprint: str) -> str:
+        """Build the cache key from the SHA-256 of the PDF bytes and the extractor fingerprint."""
+        return hashlib.sha256((_file_sha256(pdf_path) + fingerprint).encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Return cached schedules for key, or None on a miss."""
+        entry = self.cache_dir / f"{key}.json"
+        try:
+            with open(entry, 'r', encoding='utf-8') as f:
+                schedules = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Touch the entry so eviction is least-recently-used
+        os.utime(entry)
+        return schedules
+    
+    def put(self, key: str, schedules: List[Dict]):
+        """Store schedules under key and evict old entries above the size cap."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(schedules, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_dir / f"{key}.json")
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._evict()
+    
+    def clear(self):
+        """Remove every cached entry."""
+        for entry in self.cache_dir.glob("*.json"):
+            entry.unlink()
+    
+    def _evict(self):
+        """Drop least-recently-used entries until the cache fits in max_bytes."""
+        entries = [(entry.stat(), entry) for entry in self.cache_dir.glob("*.json")]
+        total = sum(stat.st_size for stat, _ in entries)
+        for stat, entry in sorted(entries, key=lambda item: item[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            entry.unlink()
+            total -= stat.st_size
+
+
+class ExtractionSummary:
+    """Summary counters accumulated one schedule at a time."""
+    
+    def __init__(self):
+        self.total_schedules = 0
+        self.degree_counts: Dict[str, int] = {}
+        self.total_classes = 0
+        self.with_classroom = 0
+        self.missing_subjects = set()
+        
+    def add(self, schedule: Dict):
+        """Count one schedule record."""
+        self.total_schedules += 1
+        
+        key = f"{schedule['degree']} - {schedule['course']} curs"
+        if schedule['specialization']:
+            key += f" ({schedule['specialization']})"
+        self.degree_counts[key] = self.degree_counts.get(key, 0) + 1
+        
+        for class_info in schedule['classes']:
+            self.total_classes += 1
+            if class_info['classroom']:
+                self.with_classroom += 1
+            else:
+                self.missing_subjects.add(class_info['subject'])
+    
+    def render(self, academic_year: str, extraction_date: str) -> str:
+        """Format the counters as the text report."""
+        summary = []
+        summary.append(f"BAU Schedule Extraction Summary (V3)")
+        summary.append(f"Academic Year: {academic_year}")
+        summary.append(f"Extraction Date: {extraction_date}")
+        summary.append(f"Total Groups: {self.total_schedules}")
+        summary.append("")
+        
+        summary.append("Groups by degree and course:")
+        for key, count in sorted(self.degree_counts.items()):
+            summary.append(f"  {key}: {count} groups")
+            
+        total_classes = self.total_classes
+        summary.append(f"\nTotal Classes: {total_classes}")
+        
+        # Count classes with/without classrooms
+        if total_classes > 0:
+            with_classroom = self.with_classroom
+            without_classroom = total_classes - with_classroom
+            
+            summary.append(f"Classes with classroom: {with_classroom} ({with_classroom/total_classes*100:.1f}%)")
+            summary.append(f"Classes without classroom: {without_classroom} ({without_classroom/total_classes*100:.1f}%)")
+            
+            # List subjects without classrooms
+            if self.missing_subjects:
+                summary.append("\nSubjects without classrooms:")
+                for subj in sorted(self.missing_subjects)[:10]:
+                    summary.append(f"  - {subj}")
+                if len(self.missing_subjects) > 10:
+                    summary.append(f"  ... and {len(self.missing_subjects) - 10} more")
+        else:
+            summary.append("No classes found in extracted data")
+        
+        return "\n".join(summary)
+
+
+class ExtractionProfiler:
+    """Per-file, per-method timings and counters for an instrumented extractor.
+    
+    Times are exclusive: a method's time doesn't include the instrumented
+    methods it calls, so the phases of one file add up to its total.
+    """
+    
+    RUN = '(run)'
+    
+    def __init__(self):
+        self.files: Dict[str, Dict] = {}
+        self.current_file = self.RUN
+        self._stack: List[List[float]] = []
+        
+    def _stats(self) -> Dict:
+        return self.files.setdefault(self.current_file, {'total': 0.0, 'phases': {}, 'counters': {}})
+    
+    def count(self, counter: str, n: int = 1):
+        """Increase a named counter of the current file."""
+        counters = self._stats()['counters']
+        counters[counter] = counters.get(counter, 0) + n
+    
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as one call of phase `name`."""
+        frame = [time.perf_counter(), 0.0]  # start, time spent in nested phases
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - frame[0]
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][1] += elapsed
+            phase = self._stats()['phases'].setdefault(name, [0, 0.0])
+            phase[0] += 1
+            phase[1] += elapsed - frame[1]
+    
+    @contextmanager
+    def file(self, name: str):
+        """Attribute everything in the enclosed block to file `name`."""
+        previous, self.current_file = self.current_file, name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._stats()['total'] += time.perf_counter() - start
+            self.current_file = previous
+    
+    def instrument(self, name: str, method, memo: Optional[Dict] = None):
+        """Wrap a bound method in a phase timer, counting memo hits when given its memo."""
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            if memo is not None:
+                self.count('memo_hits' if args and args[0] in memo else 'regex_evaluations')
+            with self.phase(name):
+                return method(*args, **kwargs)
+        return timed
+    
+    def report(self) -> str:
+        """Format the per-file, per-phase breakdown."""
+        lines = []
+        for file_name, stats in self.files.items():
+            lines.append(f"Profile: {file_name} ({stats['total']:.3f}s)")
+            phases = sorted(stats['phases'].items(), key=lambda item: item[1][1], reverse=True)
+            if phases:
+                lines.append(f"  {'phase':<34}{'calls':>9}{'self s':>10}{'share':>8}")
+            for name, (calls, seconds) in phases:
+                share = seconds / stats['total'] * 100 if stats['total'] else 0.0
+                lines.append(f"  {name:<34}{calls:>9}{seconds:>10.3f}{share:>7.1f}%")
+            if stats['counters']:
+                counters = ', '.join(f"{k}={v}" for k, v in sorted(stats['counters'].items()))
+                lines.append(f"  counters: {counters}")
+            lines.append("")
+        return "\n".join(lines)
+
+
+class TableSpatialIndex:
+    """Map the bounding box of a schedule table cell to its (day, start, end).
+    
+    Days are stored as the sorted left edges of each day's column region and
+    times as the sorted y positions of the time labels, so every lookup is a
+    bisection instead of probing neighbouring cells.
+    """
+    
+    def __init__(self, day_edges: List[Tuple[float, str]], time_marks: List[Tuple[float, str]]):
+        day_edges = sorted(day_edges)
+        time_marks = sorted(time_marks)
+        self._day_xs = [x for x, _ in day_edges]
+        self._days = [day for _, day in day_edges]
+        self._time_ys = [y for y, _ in time_marks]
+        self._times = [time for _, time in time_marks]
+        
+    def day_at(self, x: float) -> Optional[str]:
+        """Return the day whose column region contains x."""
+        idx = bisect.bisect_right(self._day_xs, x) - 1
+        return self._days[idx] if idx >= 0 else None
+    
+    def _nearest_time(self, y: float) -> int:
+        """Return the index of the time label closest to y."""
+        idx = bisect.bisect_left(self._time_ys, y)
+        if idx == len(self._time_ys) or (idx > 0 and y - self._time_ys[idx - 1] <= self._time_ys[idx] - y):
+            idx -= 1
+        return idx
+    
+    def locate(self, bbox: Tuple[float, float, float, float]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """Return (day, start, end) for a cell bbox; times are None without time labels."""
+        x0, top, x1, bottom = bbox
+        day = self.day_at((x0 + x1) / 2)
+        if len(self._times) < 2:
+            return day, None, None
+        
+        start_idx = self._nearest_time(top)
+        end_idx = max(self._nearest_time(bottom), start_idx + 1)
+        if end_idx >= len(self._times):
+            return day, None, None
+        return day, self._times[start_idx], self._times[end_idx]
+
+
 class ScheduleExtractorV3:
     """Extract schedule information from BAU PDF files - Version 3 with improved parsing."""
     
+    # Bump whenever a parsing change should invalidate cached extractions
+    EXTRACTOR_VERSION = "3.4"
+    
     def __init__(self, pdf_dir: str = "/Users/josepmarimon/Documents/github/bau-assist/horaris/pdf"):
         self.pdf_dir = Path(pdf_dir)
         self.academic_year = "2025-2026"
@@ -52,68 +338,337 @@ class ScheduleExtractorV3:
             r'^PORTATILS$': 'PORTATILS'
         }
         
-    def extract_all_pdfs(self) -> Dict:
-        """Extract schedules from all PDFs in the directory."""
-        all_schedules = []
+        # Compiled classifiers, built once from the tables above
+        self._classroom_regex = re.compile(
+            '|'.join(f'(?:{pattern})' for pattern in self.classroom_patterns), re.IGNORECASE
+        )
+        self._classroom_normalization_rules = [
+            (re.compile(pattern, re.IGNORECASE), replacement)
+            for pattern, replacement in self.classroom_normalizations.items()
+        ]
+        self._non_name_regex = re.compile(
+            r'^\d+|^[PLGM]\d+|Sala|Aula|Taller|Laboratori', re.IGNORECASE
+        )
+        self._dotted_classroom_regex = re.compile(r'([PLGM])(\d+)\.(\d+)')
+        self._spaced_classroom_regex = re.compile(r'([PLGM])(\d+)\s+(\d+)')
+        # Leftovers of the class above spilling into the next table row:
+        # date notes ('28/04)'), subgroup codes ('Gm1b'), the tail of 'Sala Carolines'
+        self._continuation_regex = re.compile(r'^\d{1,2}/\d{1,2}\b|^G[mt]\d+[a-z]?$|^Carolines?$')
+        # Subject lines end with a roman numeral ('Visual III'), teacher names never do
+        self._roman_suffix_regex = re.compile(r'(?:^|\s)(?:I{1,3}|IV|VI{0,3})$')
+        self._subject_connectors = {'i', 'de', 'del', 'dels', 'la', 'les', 'al', 'als', 'a', 'en', 'per', 'amb', 'and'}
+        
+        # Memo tables keyed on the raw cell line
+        self._classroom_memo: Dict[str, bool] = {}
+        self._teacher_memo: Dict[str, bool] = {}
+        self._normalized_classroom_memo: Dict[str, str] = {}
+        
+        # Set by enable_profiling; None keeps the extractor uninstrumented
+        self.profiler: Optional[ExtractionProfiler] = None
+        
+    def enable_profiling(self, profiler: ExtractionProfiler):
+        """Instrument every private method of this instance with profiler timers.
+        
+        Wrappers are installed on the instance only, so an extractor that never
+        calls this runs exactly the plain methods. Instrumented extractors can't
+        be sent to worker processes.
+        """
+        self.profiler = profiler
+        memos = {
+            '_is_classroom': self._classroom_memo,
+            '_is_teacher_name': self._teacher_memo,
+            '_normalize_classroom': self._normalized_classroom_memo,
+        }
+        for name, _ in inspect.getmembers(type(self), inspect.isfunction):
+            if name.startswith('_') and not name.startswith('__'):
+                setattr(self, name, profiler.instrument(name, getattr(self, name), memos.get(name)))
+        
+        # Cells visited are the cells handed to the cell parser
+        parse_cell = self._extract_class_from_cell
+        def counted_parse_cell(*args, **kwargs):
+            profiler.count('cells_visited')
+            return parse_cell(*args, **kwargs)
+        self._extract_class_from_cell = counted_parse_cell
+        
+        extract_single_pdf = self.extract_single_pdf
+        def profiled_extract_single_pdf(pdf_path: Path, *args, **kwargs):
+            with profiler.file(pdf_path.name):
+                return extract_single_pdf(pdf_path, *args, **kwargs)
+        self.extract_single_pdf = profiled_extract_single_pdf
+        
+    def cache_fingerprint(self) -> str:
+        """Describe the extractor configuration that cached results depend on."""
+        return json.dumps({
+            'version': self.EXTRACTOR_VERSION,
+            'classroom_patterns': self.classroom_patterns,
+            'classroom_normalizations': self.classroom_normalizations,
+        }, sort_keys=True)
+    
+    def extract_all_pdfs(self, workers: int = 1, page_workers: int = 1,
+                         cache: Optional[ExtractionCache] = None) -> Dict:
+        """Extract schedules from all PDFs in the directory.
+        
+        With workers > 1 each PDF is parsed in a separate process; results are
+        still merged in sorted file order so the output matches a serial run.
+        page_workers shards the pages of each PDF (see extract_single_pdf).
+        PDFs found in the cache are not parsed again.
+        """
+        all_schedules = list(self.iter_schedules(workers=workers, page_workers=page_workers,
+                                                 cache=cache))
+        return self._build_result(all_schedules)
+    
+    def extract_pdf_files(self, pdf_files: List[Path], workers: int = 1, page_workers: int = 1,
+                          cache: Optional[ExtractionCache] = None) -> Dict[Path, Optional[List[Dict]]]:
+        """Extract the given PDFs, returning their schedules (None for PDFs that failed)."""
+        return dict(self.iter_pdf_files(pdf_files, workers=workers, page_workers=page_workers,
+                                        cache=cache))
+    
+    def iter_pdf_files(self, pdf_files: List[Path], workers: int = 1, page_workers: int = 1,
+                       cache: Optional[ExtractionCache] = None) -> Iterator[Tuple[Path, Optional[List[Dict]]]]:
+        """Yield (pdf_file, schedules) in the given order as soon as each PDF is done.
+        
+        schedules is None for PDFs that failed; the error is logged.
+        """
+        # Serve unchanged PDFs from the cache
+        cached_results = {}
+        cache_keys = {}
+        if cache:
+            fingerprint = self.cache_fingerprint()
+            for pdf_file in pdf_files:
+                cache_keys[pdf_file] = cache.key(pdf_file, fingerprint)
+                cached = cache.get(cache_keys[pdf_file])
+                if cached is not None:
+                    logger.info(f"Cached: {pdf_file.name}")
+                    if self.profiler:
+                        self.profiler.count('extraction_cache_hits')
+                    cached_results[pdf_file] = cached
+        pending = [pdf_file for pdf_file in pdf_files if pdf_file not in cached_results]
+        
+        pool = None
+        futures = {}
+        if workers > 1 and len(pending) > 1:
+            pool = ProcessPoolExecutor(max_workers=min(workers, len(pending)))
+            futures = {pdf_file: pool.submit(_extract_pdf_task, self, pdf_file, page_workers)
+                       for pdf_file in pending}
         
+        try:
+            for pdf_file in pdf_files:
+                if pdf_file in cached_results:
+                    schedules = cached_results[pdf_file]
+                else:
+                    if pool:
+                        schedules, error = futures[pdf_file].result()
+                    else:
+                        schedules, error = _extract_pdf_task(self, pdf_file, page_workers)
+                    if error:
+                        logger.error(f"Error processing {pdf_file.name}:\n{error}")
+                        yield pdf_file, None
+                        continue
+                    if cache:
+                        cache.put(cache_keys[pdf_file], schedules)
+                logger.info(f"  Extracted {len(schedules)} schedules from {pdf_file.name}")
+                yield pdf_file, schedules
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+    
+    def iter_schedules(self, workers: int = 1, page_workers: int = 1,
+                       cache: Optional[ExtractionCache] = None) -> Iterator[Dict]:
+        """Yield schedule records from all PDFs in sorted file order as each PDF finishes."""
         pdf_files = sorted(self.pdf_dir.glob("*.pdf"))
         logger.info(f"Found {len(pdf_files)} PDF files to process")
         
-        for pdf_file in pdf_files:
-            logger.info(f"Processing: {pdf_file.name}")
-            try:
-                schedules = self.extract_single_pdf(pdf_file)
-                all_schedules.extend(schedules)
-                logger.info(f"  Extracted {len(schedules)} schedules from {pdf_file.name}")
-            except Exception as e:
-                logger.error(f"Error processing {pdf_file.name}: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                
-        result = {
+        for _, schedules in self.iter_pdf_files(pdf_files, workers=workers,
+                                                page_workers=page_workers, cache=cache):
+            if schedules:
+                yield from schedules
+    
+    def _build_result(self, all_schedules: List[Dict]) -> Dict:
+        """Wrap the extracted schedules in the output document."""
+        return {
             "academic_year": self.academic_year,
             "extraction_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "total_schedules": len(all_schedules),
             "schedules": all_schedules
         }
+    
+    def watch(self, output_path: str, interval: float = 2.0, workers: int = 1,
+              page_workers: int = 1, cache: Optional[ExtractionCache] = None):
+        """Poll the PDF directory and re-extract only the PDFs that changed.
         
-        return result
+        The schedules of every PDF are kept in memory, so a revision only
+        replaces the groups of that file before the output is rewritten
+        atomically. Runs until interrupted with Ctrl+C.
+        """
+        schedules_by_file: Dict[Path, List[Dict]] = {}
+        fingerprints: Dict[Path, Tuple[int, int, str, bool]] = {}
+        
+        logger.info(f"Watching {self.pdf_dir} every {interval}s (Ctrl+C to stop)")
+        try:
+            while True:
+                changed = self._poll_changes(fingerprints)
+                removed = [pdf_file for pdf_file in schedules_by_file if pdf_file not in fingerprints]
+                
+                if changed or removed:
+                    for pdf_file in removed:
+                        logger.info(f"Removed: {pdf_file.name}")
+                        del schedules_by_file[pdf_file]
+                    
+                    updated = bool(removed)
+                    results = self.extract_pdf_files(changed, workers=workers,
+                                                     page_workers=page_workers, cache=cache)
+                    for pdf_file, schedules in results.items():
+                        if schedules is None:
+                            # Keep the previous groups; retry only once the file changes on disk
+                            if pdf_file in fingerprints:
+                                fingerprints[pdf_file] = fingerprints[pdf_file][:3] + (True,)
+                            continue
+                        schedules_by_file[pdf_file] = schedules
+                        updated = True
+                    
+                    if updated:
+                        all_schedules = [schedule for pdf_file in sorted(schedules_by_file)
+                                         for schedule in schedules_by_file[pdf_file]]
+                        self.save_results(self._build_result(all_schedules), output_path)
+                    
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            logger.info("Stopped watching")
     
-    def extract_single_pdf(self, pdf_path: Path) -> List[Dict]:
-        """Extract schedules from a single PDF file."""
-        schedules = []
+    def _poll_changes(self, fingerprints: Dict[Path, Tuple[int, int, str, bool]]) -> List[Path]:
+        """Update fingerprints in place and return the PDFs whose content changed.
         
+        Fingerprints are (mtime, size, digest, failed). The file is only hashed
+        when its mtime or size moved, so touching a PDF without changing its
+        bytes doesn't trigger a re-extraction, and a PDF that failed to
+        extract keeps its failed marker until its bytes change.
+        """
+        pdf_files = sorted(self.pdf_dir.glob("*.pdf"))
+        for pdf_file in list(fingerprints):
+            if pdf_file not in pdf_files:
+                del fingerprints[pdf_file]
+        
+        changed = []
+        for pdf_file in pdf_files:
+            try:
+                stat = pdf_file.stat()
+                previous = fingerprints.get(pdf_file)
+                if previous and previous[:2] == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                digest = _file_sha256(pdf_file)
+            except OSError:
+                # The file vanished or is still being written; look again next poll
+                continue
+            
+            is_changed = not previous or previous[2] != digest
+            failed = not is_changed and previous[3]
+            fingerprints[pdf_file] = (stat.st_mtime_ns, stat.st_size, digest, failed)
+            if is_changed:
+                changed.append(pdf_file)
+        
+        return changed
+    
+    def extract_single_pdf(self, pdf_path: Path, page_workers: int = 1) -> List[Dict]:
+        """Extract schedules from a single PDF file.
+        
+        With page_workers > 1 the pages are split into contiguous ranges and
+        each range is parsed by a separate process that opens the PDF itself.
+        """
         # Extract metadata from filename
         degree, course = self._parse_filename(pdf_path.name)
         
+        if page_workers > 1:
+            with pdfplumber.open(pdf_path) as pdf:
+                num_pages = len(pdf.pages)
+            shard_size = max(1, -(-num_pages // page_workers))
+            page_ranges = [(start, min(start + shard_size, num_pages))
+                           for start in range(0, num_pages, shard_size)]
+            with ProcessPoolExecutor(max_workers=len(page_ranges)) as pool:
+                futures = [pool.submit(self._extract_page_range, pdf_path, start, end, degree, course)
+                           for start, end in page_ranges]
+                all_classes = [class_info for future in futures for class_info in future.result()]
+        else:
+            all_classes = self._extract_page_range(pdf_path, 0, None, degree, course)
+        
+        # Group classes by student group
+        return self._organize_schedules(all_classes, degree, course)
+    
+    def _extract_page_range(self, pdf_path: Path, start: int, end: Optional[int],
+                            degree: str, course: int) -> List[Dict]:
+        """Extract classes from pages [start, end) of a PDF, releasing each page once parsed."""
+        all_classes = []
+        
         with pdfplumber.open(pdf_path) as pdf:
-            all_classes = []
-            
-            for page_num, page in enumerate(pdf.pages):
+            for page_num, page in enumerate(pdf.pages[start:end], start=start):
                 logger.debug(f"Processing page {page_num + 1} of {pdf_path.name}")
-                
-                # Extract full page text and tables
-                page_text = page.extract_text() or ""
-                tables = page.extract_tables()
-                
-                # Detect semester
-                semester = self._detect_semester(page_text)
-                
-                # Extract group info
-                group_info = self._extract_group_from_text(page_text, course)
-                
-                # Process each table with improved extraction
-                for table in tables:
-                    if self._is_schedule_table(table):
-                        classes = self._extract_classes_from_table(
-                            table, page_text, degree, course, semester, group_info
-                        )
-                        all_classes.extend(classes)
+                try:
+                    all_classes.extend(self._extract_page(page, degree, course))
+                finally:
+                    # Drop the cached chars/objects so memory stays flat with page count
+                    page.close()
+        
+        return all_classes
+    
+    def _extract_page(self, page, degree: str, course: int) -> List[Dict]:
+        """Extract classes from a single pdfplumber page."""
+        classes = []
+        
+        layout = self._extract_page_layout(page)
+        page_text = layout['text']
+        
+        # Page-level fallbacks for tables without their own headers
+        page_semester = self._detect_semester(page_text)
+        
+        # Extract group info
+        group_info = self._extract_group_from_text(page_text, course)
+        
+        # Process each table with improved extraction
+        for table_layout in layout['tables']:
+            table = table_layout['rows']
+            if not self._is_schedule_table(table):
+                continue
+            
+            # Resolve semester, days and times from the words around this table
+            semester = self._detect_semester_from_words(layout['words'], table_layout, page_semester)
+            day_columns = (self._find_day_columns_from_words(layout['words'], table_layout)
+                           or self._find_day_columns_from_cells(table_layout['cells']))
+            if not day_columns:
+                logger.warning(f"Skipping table without day headers on page {page.page_number} "
+                               f"({degree} {course})")
+                continue
+            time_marks = (self._find_time_marks_from_words(layout['words'], table_layout)
+                          + self._find_time_marks_from_cells(table, table_layout['cells']))
             
-            # Group classes by student group
-            schedules = self._organize_schedules(all_classes, degree, course)
+            classes.extend(self._extract_classes_from_table(
+                table, table_layout['cells'], degree, course, semester, group_info,
+                day_columns=day_columns, time_marks=sorted(set(time_marks))
+            ))
         
-        return schedules
+        return classes
+    
+    def _extract_page_layout(self, page) -> Dict:
+        """Extract words, text and table cells of a page in a single pass.
+        
+        Words are computed once and reused to build the page text, and each
+        table keeps the bounding box of every cell next to its text so the
+        detectors can work from coordinates.
+        """
+        words = page.extract_words()
+        
+        # Same line clustering as page.extract_text(), without re-reading the chars
+        lines = cluster_objects(words, 'doctop', 3)
+        text = '\n'.join(' '.join(word['text'] for word in sorted(line, key=lambda w: w['x0']))
+                         for line in lines)
+        
+        tables = []
+        for table in page.find_tables():
+            tables.append({
+                'bbox': table.bbox,
+                'rows': table.extract(),
+                'cells': [row.cells for row in table.rows],
+            })
+        
+        return {'words': words, 'text': text, 'tables': tables}
     
     def _is_schedule_table(self, table: List[List]) -> bool:
         """Check if a table is a schedule table."""
@@ -130,89 +685,144 @@ class ScheduleExtractorV3:
             return any(indicator in first_row_text for indicator in class_indicators)
         return False
     
-    def _extract_classes_from_table(self, table: List[List], page_text: str,
+    def _extract_classes_from_table(self, table: List[List], cells: List[List],
                                    degree: str, course: int, semester: int,
-                                   group_info: Dict) -> List[Dict]:
-        """Extract classes from a schedule table with improved parsing."""
+                                   group_info: Dict,
+                                   day_columns: Dict[str, int],
+                                   time_marks: List[Tuple[float, str]]) -> List[Dict]:
+        """Extract classes from a schedule table with improved parsing.
+        
+        Every non-empty cell is placed in (day, start, end) through a spatial
+        index built from the day columns and the time labels of the table.
+        A class spans the cells right below it in the same column until a cell
+        starts another class: their lines are merged into the class cell and
+        its end time moves down to the last of them. Cells in the same slot as
+        the cell above are merged too, and other cells holding only leftovers
+        of a class (classrooms, '+...' notes, lowercase text) are skipped.
+        """
         classes = []
         
-        # Find day columns from page text instead of table
-        day_columns = self._find_day_columns_from_text(page_text, table)
-        if not day_columns:
-            # If not found in text, assume standard 5-day layout
-            day_columns = {}
-            days = ['DILLUNS', 'DIMARTS', 'DIMECRES', 'DIJOUS', 'DIVENDRES']
-            num_cols = len(table[0]) if table else 0
-            if num_cols >= 5:
-                # Distribute columns evenly across days
-                cols_per_day = num_cols // 5
-                for i, day in enumerate(days):
-                    day_columns[day] = i * cols_per_day
-        
-        # Find time slots
-        time_slots = self._extract_time_slots(page_text, table)
-        
-        # Process each row that might contain classes
-        for row_idx in range(len(table)):
-            row = table[row_idx]
-            
+        extents = self._column_extents(cells)
+        day_edges = [(extents[col_idx][0], day_name) for day_name, col_idx in day_columns.items()
+                     if col_idx < len(extents) and extents[col_idx]]
+        index = TableSpatialIndex(day_edges, time_marks)
+        
+        # One entry per class cell, with the lines of the cells merged into it
+        entries = []
+        last_entry_by_column = {}
+        for row_idx, row in enumerate(table):
             # Skip if row doesn't have enough cells
             if not row or len(row) < 5:  # At least 5 columns for 5 days
                 continue
+            
+            for col_idx, cell_content in enumerate(row):
+                if not cell_content or str(cell_content).strip() in ['', '-']:
+                    continue
+                bbox = cells[row_idx][col_idx] if col_idx < len(cells[row_idx]) else None
+                if bbox is None:
+                    continue
                 
-            # Process each day column
-            for day_name, col_idx in day_columns.items():
-                # Check column and potentially adjacent columns
-                for offset in range(2):  # Check current and next column
-                    check_idx = col_idx + offset
-                    if check_idx >= len(row):
-                        continue
-                        
-                    cell_content = row[check_idx]
-                    if not cell_content or str(cell_content).strip() in ['', '-']:
-                        continue
-                        
-                    # Extract class info from cell and surrounding cells
-                    class_info = self._extract_class_from_cell(
-                        table, row_idx, check_idx, day_name, time_slots, semester
-                    )
-                    
-                    if class_info and not self._is_tutoria(class_info['subject']):
-                        # Add group info
-                        class_info['group'] = group_info.get('full_name', 'Unknown')
-                        class_info['group_code'] = group_info.get('code', 'Unknown')
-                        classes.append(class_info)
-                        break  # Don't check offset if we found a class
+                slot = index.locate(bbox)
+                if not slot[0]:
+                    continue
+                lines = [line.strip() for line in str(cell_content).split('\n') if line.strip()]
+                
+                above = last_entry_by_column.get(col_idx)
+                if above and (above['slot'] == slot
+                              or (above['slot'][0] == slot[0]
+                                  and abs(bbox[1] - above['bbox'][3]) < 2
+                                  and not self._starts_class(lines))):
+                    above['lines'].extend(line for line in lines if line not in above['lines'])
+                    above['bbox'] = (above['bbox'][0], above['bbox'][1], above['bbox'][2],
+                                     max(above['bbox'][3], bbox[3]))
+                    above['slot'] = index.locate(above['bbox'])
+                    continue
+                if all(self._is_continuation_line(line) for line in lines):
+                    continue
+                
+                entry = {'row_idx': row_idx, 'col_idx': col_idx, 'bbox': bbox, 'slot': slot, 'lines': lines}
+                last_entry_by_column[col_idx] = entry
+                entries.append(entry)
+        
+        for entry in entries:
+            day_name, start, end = entry['slot']
+            if not start:
+                logger.warning(f"Skipping cell without time labels ({degree} {course}, "
+                               f"{day_name}): {' / '.join(entry['lines'])}")
+                continue
+            
+            # Extract class info from the cell and the cells merged into it
+            class_info = self._extract_class_from_cell(
+                '\n'.join(entry['lines']), day_name, (start, end), semester
+            )
+            
+            if class_info and not self._is_tutoria(class_info['subject']):
+                # Add group info
+                class_info['group'] = group_info.get('full_name', 'Unknown')
+                class_info['group_code'] = group_info.get('code', 'Unknown')
+                classes.append(class_info)
         
         return classes
     
-    def _extract_class_from_cell(self, table: List[List], row_idx: int, col_idx: int,
-                                day_name: str, time_slots: List[Tuple[str, str]], 
-                                semester: int) -> Optional[Dict]:
-        """Extract complete class information from a cell and surrounding context."""
-        # Get the current cell
-        cell_content = str(table[row_idx][col_idx]).strip()
+    def _extract_class_from_cell(self, cell_content: str, day_name: str,
+                                time_slot: Tuple[str, str], semester: int) -> Optional[Dict]:
+        """Extract complete class information from the text of a class cell."""
+        subject, teacher, classroom = self._parse_cell_lines(cell_content.split('\n'))
+        
+        if not subject:
+            return None
+        
+        # Map day name to number
+        day_map = {
+            'DILLUNS': 1, 'DIMARTS': 2, 'DIMECRES': 3,
+            'DIJOUS': 4, 'DIVENDRES': 5
+        }
+        day_num = day_map.get(day_name.upper(), 0)
         
+        return {
+            "subject": subject,
+            "teacher": teacher,
+            "classroom": self._normalize_classroom(classroom) if classroom else None,
+            "semester": semester,
+            "day_of_week": day_num,
+            "day_name": day_name.title(),
+            "start_time": time_slot[0],
+            "end_time": time_slot[1]
+        }
+    
+    def _parse_cell_lines(self, cell_lines: List[str]) -> Tuple[str, Optional[str], Optional[str]]:
+        """Split the lines of a cell into (subject, teacher, classroom)."""
         # Initialize variables
         subject_parts = []
+        subject_end = None
         teacher = None
         classroom = None
         
-        # Extract from current cell
-        lines = cell_content.split('\n')
+        # Drop the repeated lines of text drawn twice
+        lines = []
+        for line in cell_lines:
+            line = self._undouble(line.strip())
+            if line and (not lines or line != lines[-1]):
+                lines.append(line)
         
         # Process lines in the cell
         for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                continue
-                
+            # A subject name goes on over lowercase lines, after a trailing
+            # 'i'/'de'/comma and up to its roman numeral
+            continues = subject_end == i - 1 and self._continues_subject(subject_parts[-1], line)
+            starts = i == 0 and i + 1 < len(lines) and self._continues_subject(line, lines[i + 1])
+            
             # First 1-2 lines are usually the subject
-            if i < 2 and not self._is_classroom(line) and not self._is_teacher_name(line):
+            if not self._is_classroom(line) and (
+                    continues or starts
+                    or (i < 2 and not self._is_teacher_name(line))):
                 subject_parts.append(line)
-            # Check if it's a classroom
-            elif self._is_classroom(line):
-                classroom = line
+                subject_end = i
+            # Classroom lists run over several lines ('P1.2+P1.3', 'G2.1+', 'Sala', 'Carolines')
+            elif self._is_classroom(line) or (classroom and line.startswith('+')):
+                classroom = self._join_classroom(classroom, line)
+            elif classroom and classroom.endswith('Sala') and line.startswith('Caroline'):
+                classroom = f"{classroom} {line}"
             # Check if it looks like a teacher name
             elif self._is_teacher_name(line) and not teacher:
                 teacher = line
@@ -220,113 +830,90 @@ class ScheduleExtractorV3:
             elif line in ['Gràfica I', 'Gràfica II', 'I', 'II'] and 'Expressió' in ' '.join(subject_parts):
                 subject_parts.append(line)
         
-        # Check cells below for classroom (common pattern in these PDFs)
-        if not classroom:
-            for offset in range(1, min(3, len(table) - row_idx)):
-                if row_idx + offset < len(table) and col_idx < len(table[row_idx + offset]):
-                    below_cell = table[row_idx + offset][col_idx]
-                    if below_cell:
-                        below_text = str(below_cell).strip()
-                        # Check if entire cell is a classroom
-                        if self._is_classroom(below_text) and len(below_text) < 20:
-                            classroom = below_text
-                            break
-                        # Check lines within cell
-                        for line in below_text.split('\n'):
-                            line = line.strip()
-                            if self._is_classroom(line) and len(line) < 20:
-                                classroom = line
-                                break
-        
-        # Also check cells in adjacent columns for classroom
-        if not classroom:
-            for col_offset in [-1, 1]:
-                check_col = col_idx + col_offset
-                if 0 <= check_col < len(table[row_idx]):
-                    adj_cell = table[row_idx][check_col]
-                    if adj_cell:
-                        adj_text = str(adj_cell).strip()
-                        if self._is_classroom(adj_text) and len(adj_text) < 20:
-                            classroom = adj_text
-                            break
-        
         # Combine subject parts
         subject = ' '.join(subject_parts)
         
         # Clean up subject name
         subject = self._clean_subject_name(subject)
         
-        if not subject:
-            return None
-        
-        # Find appropriate time slot
-        time_slot = self._find_time_slot_for_row(row_idx, time_slots)
-        
-        # Map day name to number
-        day_map = {
-            'DILLUNS': 1, 'DIMARTS': 2, 'DIMECRES': 3,
-            'DIJOUS': 4, 'DIVENDRES': 5
-        }
-        day_num = day_map.get(day_name.upper(), 0)
-        
-        return {
-            "subject": subject,
-            "teacher": teacher,
-            "classroom": self._normalize_classroom(classroom) if classroom else None,
-            "semester": semester,
-            "day_of_week": day_num,
-            "day_name": day_name.title(),
-            "start_time": time_slot[0],
-            "end_time": time_slot[1]
-        }
+        return subject, teacher, classroom
+    
+    def _join_classroom(self, classroom: Optional[str], line: str) -> str:
+        """Append a classroom line to the classroom list read so far."""
+        if not classroom:
+            return line
+        if line in classroom.split('+'):
+            return classroom
+        if classroom.endswith('+') or line.startswith('+'):
+            return classroom + line
+        return f"{classroom}+{line}"
+    
+    def _starts_class(self, lines: List[str]) -> bool:
+        """Check if cell lines start a new class instead of carrying on the one above."""
+        if all(self._is_continuation_line(line) for line in lines):
+            return False
+        return bool(self._parse_cell_lines(lines)[0])
     
     def _is_classroom(self, text: str) -> bool:
         """Check if text contains a classroom reference."""
         if not text:
             return False
-            
-        text = text.strip()
         
-        # Quick check for common classroom prefixes
-        if text[:2] in ['P.', 'G.', 'L.', 'P0', 'G0', 'L0', 'P1', 'G1', 'L1', 'P2', 'G2', 'L2']:
-            return True
+        cached = self._classroom_memo.get(text)
+        if cached is not None:
+            return cached
             
-        # Check against patterns
-        for pattern in self.classroom_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return True
-                
-        return False
+        stripped = text.strip()
+        
+        # Quick check for common classroom prefixes, then the combined pattern
+        result = (stripped[:2] in ['P.', 'G.', 'L.', 'P0', 'G0', 'L0', 'P1', 'G1', 'L1', 'P2', 'G2', 'L2']
+                  or self._classroom_regex.search(stripped) is not None)
+        
+        self._classroom_memo[text] = result
+        return result
     
     def _is_teacher_name(self, text: str) -> bool:
         """Check if text looks like a teacher name."""
         if not text or len(text) < 5:
             return False
-            
-        # Teacher names usually have at least two words
-        words = text.split()
-        if len(words) < 2:
-            return False
-            
-        # Check if it starts with a capital letter
-        if not text[0].isupper():
-            return False
-            
-        # Avoid common non-name patterns
-        non_name_patterns = [
-            r'^\d+',  # Starts with number
-            r'^[PLGM]\d+',  # Classroom code
-            r'Sala',
-            r'Aula',
-            r'Taller',
-            r'Laboratori'
-        ]
         
-        for pattern in non_name_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return False
-                
-        return True
+        cached = self._teacher_memo.get(text)
+        if cached is not None:
+            return cached
+        
+        # Teacher names usually have at least two words, start with a capital
+        # letter and don't match common non-name patterns
+        result = (len(text.split()) >= 2
+                  and text[0].isupper()
+                  and self._non_name_regex.search(text) is None)
+        
+        self._teacher_memo[text] = result
+        return result
+    
+    def _is_continuation_line(self, line: str) -> bool:
+        """Check if a cell line only carries on the class of the cell above."""
+        if self._is_tutoria(line):
+            return False
+        return (self._is_classroom(line)
+                or line.startswith('+')
+                or line[0].islower()
+                or self._continuation_regex.search(line) is not None)
+    
+    def _continues_subject(self, previous: str, line: str) -> bool:
+        """Check if line is the next line of a subject name ending with previous."""
+        return (line[0].islower()
+                or previous.endswith(',')
+                or previous.split()[-1] in self._subject_connectors
+                or line.split()[-1] in self._subject_connectors
+                or self._roman_suffix_regex.search(line) is not None)
+    
+    def _undouble(self, text: str) -> str:
+        """Undo text drawn twice over itself ('CCuullttuurraa' -> 'Cultura')."""
+        words = text.split()
+        if (any(len(word) >= 6 for word in words)
+                and all(len(word) % 2 == 0 and word[::2] == word[1::2] for word in words)):
+            return ' '.join(word[::2] for word in words)
+        return text
     
     def _clean_subject_name(self, subject: str) -> str:
         """Clean and complete subject names."""
@@ -370,75 +957,103 @@ class ScheduleExtractorV3:
                             
         return day_columns
     
-    def _find_day_columns_from_text(self, page_text: str, table: List[List]) -> Dict[str, int]:
-        """Find which columns correspond to which days from page text."""
-        day_columns = {}
+    def _column_extents(self, cells: List[List]) -> List[Tuple[float, float]]:
+        """Return the narrowest (x0, x1) seen for each table column."""
+        extents = []
+        for row in cells:
+            for col_idx, cell in enumerate(row):
+                if cell is None:
+                    continue
+                if col_idx >= len(extents):
+                    extents.extend([None] * (col_idx + 1 - len(extents)))
+                current = extents[col_idx]
+                if current is None or cell[2] - cell[0] < current[1] - current[0]:
+                    extents[col_idx] = (cell[0], cell[2])
+        return extents
+    
+    def _find_day_columns_from_words(self, words: List[Dict], table_layout: Dict) -> Dict[str, int]:
+        """Map each day header above the table to the column under its centre."""
         days = ['DILLUNS', 'DIMARTS', 'DIMECRES', 'DIJOUS', 'DIVENDRES']
+        table_top = table_layout['bbox'][1]
         
-        # Look for day line in page text
-        lines = page_text.split('\n')
-        day_line = None
-        for line in lines[:10]:  # Check first 10 lines
-            if all(day in line.upper() for day in days[:3]):  # At least first 3 days
-                day_line = line
-                break
+        # Only the closest header line above this table
+        headers = [w for w in words if w['text'].upper() in days and w['bottom'] <= table_top + 2]
+        if not headers:
+            return {}
+        header_bottom = max(w['bottom'] for w in headers)
+        headers = [w for w in headers if header_bottom - w['bottom'] < 5]
         
-        if day_line:
-            # Simple heuristic: assume equal spacing
-            num_cols = len(table[0]) if table else 0
-            if num_cols >= 5:
-                cols_per_day = max(1, num_cols // 5)
-                for i, day in enumerate(days):
-                    day_columns[day] = i * cols_per_day
+        extents = self._column_extents(table_layout['cells'])
+        day_columns = {}
+        for word in headers:
+            center = (word['x0'] + word['x1']) / 2
+            for col_idx, extent in enumerate(extents):
+                if extent and extent[0] <= center < extent[1]:
+                    day_columns.setdefault(word['text'].upper(), col_idx)
+                    break
         
         return day_columns
     
-    def _extract_time_slots(self, page_text: str, table: List[List]) -> List[Tuple[str, str]]:
-        """Extract time slots from page text or table."""
-        time_slots = []
+    def _find_day_columns_from_cells(self, cells: List[List]) -> Dict[str, int]:
+        """Map days to the wide columns of a table that has no day headers.
         
-        # First, look for explicit time patterns in text
-        lines = page_text.split('\n')
-        current_start = None
+        Day columns are separated by narrow spacer columns, so the five widest
+        column groups are taken in left-to-right order.
+        """
+        days = ['DILLUNS', 'DIMARTS', 'DIMECRES', 'DIJOUS', 'DIVENDRES']
+        extents = self._column_extents(cells)
+        widths = [extent[1] - extent[0] if extent else 0 for extent in extents]
+        if not widths:
+            return {}
         
-        for line in lines:
-            # Look for time patterns like "09:00" or "11:00"
-            time_match = re.search(r'(\d{1,2}:\d{2})', line)
-            if time_match:
-                time_str = self._normalize_time(time_match.group(1))
-                
-                # Check if this line contains just a time (likely a time marker)
-                if len(line.strip()) <= 10:  # Short line, probably just time
-                    if current_start:
-                        # This is an end time
-                        time_slots.append((current_start, time_str))
-                        current_start = time_str
-                    else:
-                        # This is a start time
-                        current_start = time_str
-        
-        # Add final slot if we have a hanging start time
-        if current_start and not any(s[0] == current_start for s in time_slots):
-            # Assume it goes until 13:30 or 19:30
-            end_time = "19:30" if current_start >= "15:00" else "13:30"
-            time_slots.append((current_start, end_time))
-        
-        # If no time slots found, determine from context
-        if not time_slots:
-            if 'tarda' in page_text.lower() or any(time in page_text for time in ['15:', '16:', '17:', '18:', '19:']):
-                time_slots = [("15:00", "19:30")]
-            else:
-                time_slots = [("09:00", "13:30")]
-                
-        return time_slots
+        wide_columns = [col_idx for col_idx, width in enumerate(widths) if width >= max(widths) / 2]
+        if len(wide_columns) != len(days):
+            return {}
+        return dict(zip(days, wide_columns))
+    
+    def _find_time_marks_from_words(self, words: List[Dict], table_layout: Dict) -> List[Tuple[float, str]]:
+        """Return (y, time) for the time labels in the margin left of the table.
+        
+        Each label sits just above the row boundary it marks, so its bottom
+        edge is used as the boundary position.
+        """
+        x0, top, _, bottom = table_layout['bbox']
+        return sorted(
+            (w['bottom'], self._normalize_time(w['text'])) for w in words
+            if re.match(r'^\d{1,2}:\d{2}$', w['text'])
+            and w['x1'] <= x0 and top - 20 <= w['bottom'] <= bottom + 20
+        )
     
-    def _find_time_slot_for_row(self, row_idx: int, time_slots: List[Tuple[str, str]]) -> Tuple[str, str]:
-        """Find the appropriate time slot for a given row."""
-        # For now, return the first time slot
-        # This could be improved with better logic
-        if time_slots:
-            return time_slots[0]
-        return ("09:00", "13:30")
+    def _find_time_marks_from_cells(self, table: List[List], cells: List[List]) -> List[Tuple[float, str]]:
+        """Return (y, time) for the time labels written in the table's own cells.
+        
+        A time cell starts the row it is in, so its top edge is used as the
+        boundary position.
+        """
+        marks = []
+        for row_idx, row in enumerate(table):
+            for col_idx, cell_content in enumerate(row):
+                text = str(cell_content or '').strip()
+                if (re.match(r'^\d{1,2}:\d{2}$', text)
+                        and col_idx < len(cells[row_idx]) and cells[row_idx][col_idx]):
+                    marks.append((cells[row_idx][col_idx][1], self._normalize_time(text)))
+        return marks
+    
+    def _detect_semester_from_words(self, words: List[Dict], table_layout: Dict, default: int) -> int:
+        """Detect the semester from the closest 'SEMESTRE' heading above the table."""
+        table_top = table_layout['bbox'][1]
+        headings = [w for w in words if w['text'].upper() == 'SEMESTRE' and w['bottom'] <= table_top]
+        if not headings:
+            return default
+        heading = max(headings, key=lambda w: w['bottom'])
+        
+        # The ordinal ("1r", "2n") is the word just left of the heading on the same line
+        ordinals = [w for w in words
+                    if abs(w['top'] - heading['top']) < 3 and w['x1'] <= heading['x0']]
+        if not ordinals:
+            return default
+        ordinal = max(ordinals, key=lambda w: w['x1'])['text']
+        return 2 if ordinal.startswith('2') else 1
     
     def _detect_semester(self, page_text: str) -> int:
         """Detect semester from page text."""
@@ -593,21 +1208,26 @@ class ScheduleExtractorV3:
         """Normalize classroom codes."""
         if not classroom:
             return classroom
-            
+        
+        cached = self._normalized_classroom_memo.get(classroom)
+        if cached is not None:
+            return cached
+        
+        raw = classroom
         classroom = classroom.strip()
         
         # Apply normalization rules
-        for pattern, replacement in self.classroom_normalizations.items():
-            if re.match(pattern, classroom, re.IGNORECASE):
-                classroom = re.sub(pattern, replacement, classroom, flags=re.IGNORECASE)
+        for pattern, replacement in self._classroom_normalization_rules:
+            if pattern.match(classroom):
+                classroom = pattern.sub(replacement, classroom)
                 break
                 
         # Handle special cases
         # P1.6 -> P.1.6
-        classroom = re.sub(r'([PLGM])(\d+)\.(\d+)', r'\1.\2.\3', classroom)
+        classroom = self._dotted_classroom_regex.sub(r'\1.\2.\3', classroom)
         
         # P1 2 -> P.1.2
-        classroom = re.sub(r'([PLGM])(\d+)\s+(\d+)', r'\1.\2.\3', classroom)
+        classroom = self._spaced_classroom_regex.sub(r'\1.\2.\3', classroom)
         
         # Handle multiple classrooms
         if '+' in classroom:
@@ -618,7 +1238,8 @@ class ScheduleExtractorV3:
             parts = classroom.split('/')
             normalized_parts = [self._normalize_classroom(part.strip()) for part in parts]
             classroom = '/'.join(normalized_parts)
-            
+        
+        self._normalized_classroom_memo[raw] = classroom
         return classroom
     
     def _normalize_time(self, time_str: str) -> str:
@@ -637,80 +1258,142 @@ class ScheduleExtractorV3:
         return any(t in subject_lower for t in ['tutoria', 'tutories', 'tutorias'])
     
     def save_results(self, data: Dict, output_path: str):
-        """Save extraction results to JSON file."""
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        """Save extraction results to JSON file; '-' writes to stdout."""
+        if output_path == '-':
+            json.dump(data, sys.stdout, ensure_ascii=False, indent=2)
+            sys.stdout.write('\n')
+            sys.stdout.flush()
+            return
+        _write_json_atomic(data, output_path)
         logger.info(f"Results saved to {output_path}")
         
+    def save_results_ndjson(self, schedules: Iterator[Dict], output_path: str) -> ExtractionSummary:
+        """Stream schedule records to output_path, one JSON object per line.
+        
+        Each line is flushed as soon as it is written so downstream loaders can
+        consume records while extraction is still running; '-' writes to
+        stdout. Returns the summary counters gathered in the same pass.
+        """
+        summary = ExtractionSummary()
+        f = sys.stdout if output_path == '-' else open(output_path, 'w', encoding='utf-8')
+        try:
+            for schedule in schedules:
+                f.write(json.dumps(schedule, ensure_ascii=False) + '\n')
+                f.flush()
+                summary.add(schedule)
+        finally:
+            if f is not sys.stdout:
+                f.close()
+        logger.info(f"Results streamed to {output_path}")
+        return summary
+    
     def generate_summary(self, data: Dict) -> str:
         """Generate a summary report of extracted data."""
-        summary = []
-        summary.append(f"BAU Schedule Extraction Summary (V3)")
-        summary.append(f"Academic Year: {data['academic_year']}")
-        summary.append(f"Extraction Date: {data['extraction_date']}")
-        summary.append(f"Total Groups: {data['total_schedules']}")
-        summary.append("")
-        
-        # Count by degree and course
-        degree_counts = {}
+        summary = ExtractionSummary()
         for schedule in data['schedules']:
-            key = f"{schedule['degree']} - {schedule['course']} curs"
-            if schedule['specialization']:
-                key += f" ({schedule['specialization']})"
-            degree_counts[key] = degree_counts.get(key, 0) + 1
-            
-        summary.append("Groups by degree and course:")
-        for key, count in sorted(degree_counts.items()):
-            summary.append(f"  {key}: {count} groups")
-            
-        # Count total classes
-        total_classes = sum(len(s['classes']) for s in data['schedules'])
-        summary.append(f"\nTotal Classes: {total_classes}")
-        
-        # Count classes with/without classrooms
-        if total_classes > 0:
-            with_classroom = sum(1 for s in data['schedules'] 
-                               for c in s['classes'] if c['classroom'])
-            without_classroom = total_classes - with_classroom
-            
-            summary.append(f"Classes with classroom: {with_classroom} ({with_classroom/total_classes*100:.1f}%)")
-            summary.append(f"Classes without classroom: {without_classroom} ({without_classroom/total_classes*100:.1f}%)")
-            
-            # List subjects without classrooms
-            missing_subjects = set()
-            for s in data['schedules']:
-                for c in s['classes']:
-                    if not c['classroom']:
-                        missing_subjects.add(c['subject'])
-                        
-            if missing_subjects:
-                summary.append("\nSubjects without classrooms:")
-                for subj in sorted(missing_subjects)[:10]:
-                    summary.append(f"  - {subj}")
-                if len(missing_subjects) > 10:
-                    summary.append(f"  ... and {len(missing_subjects) - 10} more")
-        else:
-            summary.append("No classes found in extracted data")
-        
-        return "\n".join(summary)
+            summary.add(schedule)
+        # Keep the declared total, as before
+        summary.total_schedules = data['total_schedules']
+        return summary.render(data['academic_year'], data['extraction_date'])
+
+
+def _extract_pdf_task(extractor: ScheduleExtractorV3, pdf_path: Path,
+                      page_workers: int = 1) -> Tuple[List[Dict], Optional[str]]:
+    """Extract one PDF, returning (schedules, traceback) so one failure doesn't abort the run."""
+    logger.info(f"Processing: {pdf_path.name}")
+    try:
+        return extractor.extract_single_pdf(pdf_path, page_workers=page_workers), None
+    except Exception:
+        return [], traceback.format_exc()
 
 
 def main():
     """Main execution function."""
+    parser = argparse.ArgumentParser(description="Extract BAU schedules from PDF files (Version 3)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of processes used to parse PDFs in parallel (default: 1)")
+    parser.add_argument('--page-workers', type=int, default=1,
+                        help="Number of processes sharing the pages of each PDF (default: 1)")
+    parser.add_argument('--cache-dir', default="/Users/josepmarimon/Documents/github/bau-assist/data/.pdf_extraction_cache",
+                        help="Directory of the per-PDF extraction cache")
+    parser.add_argument('--cache-max-mb', type=int, default=64,
+                        help="Size cap of the extraction cache in MB (default: 64)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Parse every PDF without reading or writing the cache")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Discard the cache and parse every PDF again")
+    parser.add_argument('--output', default="/Users/josepmarimon/Documents/github/bau-assist/data/schedules_extracted_v3_2025-2026.json",
+                        help="Path of the extracted schedules JSON ('-' for stdout)")
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep running and re-extract PDFs as they change")
+    parser.add_argument('--interval', type=float, default=2.0,
+                        help="Seconds between directory polls in watch mode (default: 2)")
+    parser.add_argument('--format', choices=['json', 'ndjson'], default='json',
+                        help="json writes one document at the end; ndjson streams one schedule per line")
+    parser.add_argument('--profile', action='store_true',
+                        help="Print a per-file, per-phase timing breakdown (runs in a single process)")
+    parser.add_argument('--profile-output',
+                        help="Also write cProfile statistics to this file (readable with pstats)")
+    args = parser.parse_args()
+    if args.watch and args.output == '-':
+        parser.error("--watch patches the output file in place; it can't write to stdout ('-')")
+    
     extractor = ScheduleExtractorV3()
     
+    profiler = None
+    if args.profile:
+        profiler = ExtractionProfiler()
+        extractor.enable_profiling(profiler)
+        if args.workers > 1 or args.page_workers > 1:
+            logger.warning("--profile runs in a single process; ignoring --workers/--page-workers")
+            args.workers = args.page_workers = 1
+    
+    cache = None
+    if not args.no_cache:
+        cache = ExtractionCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+        if args.rebuild:
+            cache.clear()
+    
+    if args.watch:
+        extractor.watch(args.output, interval=args.interval, workers=args.workers,
+                        page_workers=args.page_workers, cache=cache)
+        return
+    
     logger.info("Starting PDF schedule extraction (Version 3)...")
     
-    # Extract all schedules
-    results = extractor.extract_all_pdfs()
+    c_profile = cProfile.Profile() if args.profile_output else None
+    if c_profile:
+        c_profile.enable()
+    
+    if args.format == 'ndjson':
+        # Stream records as each PDF finishes and count them on the way
+        output_path = args.output
+        if output_path.endswith('.json'):
+            output_path = output_path[:-len('.json')] + '.ndjson'
+        schedules = extractor.iter_schedules(workers=args.workers, page_workers=args.page_workers,
+                                             cache=cache)
+        counters = extractor.save_results_ndjson(schedules, output_path)
+        summary = counters.render(extractor.academic_year, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    else:
+        # Extract all schedules
+        results = extractor.extract_all_pdfs(workers=args.workers, page_workers=args.page_workers,
+                                             cache=cache)
+        
+        # Save results
+        extractor.save_results(results, args.output)
+        
+        # Generate summary
+        summary = extractor.generate_summary(results)
     
-    # Save results
-    output_path = "/Users/josepmarimon/Documents/github/bau-assist/data/schedules_extracted_v3_2025-2026.json"
-    extractor.save_results(results, output_path)
+    if c_profile:
+        c_profile.disable()
+        c_profile.dump_stats(args.profile_output)
+        logger.info(f"cProfile statistics saved to {args.profile_output}")
+    if profiler:
+        print(profiler.report(), file=sys.stderr)
     
-    # Generate and print summary
-    summary = extractor.generate_summary(results)
-    print("\n" + summary)
+    # Print summary
+    print("\n" + summary, file=sys.stderr if args.output == '-' else sys.stdout)
     
     # Save summary
     summary_path = "/Users/josepmarimon/Documents/github/bau-assist/data/extraction_summary_v3.txt"
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Local result store for the Excel timetable extraction pipeline.
+Keeps the entries every extractor produced for each source workbook in one
+SQLite file, keyed by (source file hash, extractor name, extractor version),
+so a re-run only recomputes the workbooks that changed and the merge/fix
+stages can read the per-file results instead of the full JSON exports.
+The source file name is part of the key too: entries carry fields derived
+from it (archivo, curso, grado), so byte-identical copies under another name
+keep results of their own.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+DEFAULT_STORE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  '..', 'csv', '.extraction_store.sqlite')
+
+# Stored in PRAGMA user_version; stores of an older schema are rebuilt
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    source_hash TEXT NOT NULL,
+    extractor TEXT NOT NULL,
+    version TEXT NOT NULL,
+    source_name TEXT NOT NULL,
+    extracted_at TEXT NOT NULL,
+    entries TEXT NOT NULL,
+    PRIMARY KEY (source_hash, source_name, extractor, version)
+)
+"""
+
+
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionStore:
+    """Per-file extraction results in a SQLite file.
+
+    Only successful extractions are stored; entries must be JSON-serialisable.
+    hits and misses count the get() lookups of this instance.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_FILE):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            # Only a cache: results keyed without the file name are dropped
+            with self.connection:
+                self.connection.execute("DROP TABLE IF EXISTS results")
+                self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.connection.execute(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+        self._hashes = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def source_hash(self, path):
+        """SHA-256 of a source file, computed once per run while the file is unchanged."""
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        if key not in self._hashes:
+            self._hashes[key] = file_sha256(path)
+        return self._hashes[key]
+
+    def get(self, source_hash, source_name, extractor, version):
+        """Return the stored entries, or None when this file was not extracted with this version."""
+        row = self.connection.execute(
+            "SELECT entries FROM results WHERE source_hash = ? AND source_name = ? AND extractor = ? "
+            "AND version = ?",
+            (source_hash, source_name, extractor, str(version))).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, source_hash, extractor, version, source_name, entries):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (source_hash, extractor, str(version), source_name, datetime.now().isoformat(),
+                 json.dumps(entries, ensure_ascii=False)))
+
+    def entries(self, extractor, version=None):
+        """All stored entries of an extractor, in source file name order.
+
+        Run the extractor (which prunes results of files that changed or
+        disappeared) first so that only the current files are included.
+        """
+        query = "SELECT entries FROM results WHERE extractor = ?"
+        params = [extractor]
+        if version is not None:
+            query += " AND version = ?"
+            params.append(str(version))
+        entries = []
+        for (stored,) in self.connection.execute(query + " ORDER BY source_name, extracted_at", params):
+            entries.extend(json.loads(stored))
+        return entries
+
+    def prune(self, extractor, version, sources):
+        """Drop the extractor's results for other versions or for files not in sources.
+
+        sources holds the (source hash, source name) of the current files.
+        Returns the number of results removed.
+        """
+        sources = set(sources)
+        stale = [(source_hash, source_name, stored_version)
+                 for source_hash, source_name, stored_version in self.connection.execute(
+                     "SELECT source_hash, source_name, version FROM results WHERE extractor = ?", (extractor,))
+                 if stored_version != str(version) or (source_hash, source_name) not in sources]
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM results WHERE source_hash = ? AND source_name = ? AND extractor = ? AND version = ?",
+                [(source_hash, source_name, extractor, stored_version)
+                 for source_hash, source_name, stored_version in stale])
+        return len(stale)
+
+    def clear(self, extractor=None):
+        """Remove the results of one extractor, or of all of them."""
+        with self.connection:
+            if extractor is None:
+                self.connection.execute("DELETE FROM results")
+            else:
+                self.connection.execute("DELETE FROM results WHERE extractor = ?", (extractor,))
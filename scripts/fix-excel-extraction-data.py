@@ -4,148 +4,77 @@ Fix and clean the extracted Excel data to correct misidentified subjects.
 This script manually fixes known issues in the extraction.
 """
 
+import argparse
 import json
-import re
 from datetime import datetime
 
+from excel_corrections import ExcelCorrections
+from extraction_store import DEFAULT_STORE_FILE, ExtractionStore
+
 # File paths
 INPUT_FILE = '/Users/josepmarimon/Documents/github/bau-assist/csv/extracted_excel_data.json'
 OUTPUT_FILE = '/Users/josepmarimon/Documents/github/bau-assist/csv/extracted_excel_data_fixed.json'
 
-def fix_extracted_data(data):
-    """Fix known issues in extracted data"""
-    
-    # List of entries to remove (false positives - not real subjects)
-    entries_to_remove = [
-        # These are professor names, not subjects
-        "Mireia Carbonell",
-        "Mónica Rikic Luis Colaço",
-        "Núria Costa",
-        "Pierino dal Pozzo",
-        "Joan Ros\n+",
-        "Guarin",
-        
-        # These are group codes, not subjects
-        "Gm2",
-        "Gm1a\nDavid Torrents P1.7",
-        
-        # These are fragments or incomplete
-        "Expressió",  # Fragment of "Expressió Gràfica"
-        "Iniciació als",  # Fragment
-        "Projectes de",  # Fragment
-        "Disseny i",  # Fragment
-        "Comunicació",  # Fragment (when standalone)
-        "d'Artista",  # Fragment of "Taller d'Edicions d'Artista"
-        "Pedagogies",  # Fragment
-    ]
-    
-    # Manual corrections for incomplete subject names
-    name_corrections = {
-        # Fix fragments that should be complete names
-        "Taller d'Expressió\ni Comunicació": "Taller d'Expressió i Comunicació",
-        "Iconografia\ni Comunicació": "Iconografia i Comunicació",
-        "Estètica i Teoria de les Arts": "Estètica i Teoria de les Arts",
-        "Eines Informatiques I\nAnna Ferré Elisenda Fontarnau Pau Pericas\nP1.2+P1.3+P1.8 P1.12+G2.1+\nPlatós+Sala": "Eines Informatiques I",
-        "Eines Informatiques II\nGlòria Deumal Ricard Marimon Daniel Tahmaz P1.2+P1.3+P1.12 P1.8+G2.1+\nPlatós+Sala Carolines": "Eines Informatiques II",
-    }
+# EXTRACTOR_NAME of extract-all-excel-schedules.py, whose output is fixed here
+SOURCE_EXTRACTOR = 'excel_cells_v1'
+
+def fix_extracted_data(data, corrections=None):
+    """Fix known issues in extracted data
+    
+    The rules live in csv/excel_corrections.json (see excel_corrections.py),
+    so the same corrections can also be applied during extraction.
+    """
+    if corrections is None:
+        corrections = ExcelCorrections.load()
     
-    # Clean professor names that include classroom info
-    professor_cleaning_patterns = [
-        (r'\s*P[0-9]\.[0-9]+(?:/[0-9]+)?', ''),  # Remove classroom codes
-        (r'\s*G[0-9]\.[0-9]+', ''),  # Remove G classrooms
-        (r'\s*L[0-9]\.[0-9]+', ''),  # Remove L classrooms
-        (r'\s*Platós.*', ''),  # Remove Platós and everything after
-        (r'\s*Sala\s+\w+.*', ''),  # Remove Sala and everything after
-        (r'\s+\+\s+', ' '),  # Replace + with space
-        (r'\s+', ' '),  # Normalize spaces
-    ]
-    
-    # Process the data
     fixed_data = []
     removed_count = 0
     fixed_count = 0
     
     for entry in data:
-        subject_name = entry.get('asignatura', '')
-        
-        # Check if this entry should be removed
-        should_remove = False
-        for remove_pattern in entries_to_remove:
-            if subject_name == remove_pattern or subject_name.strip() == remove_pattern:
-                should_remove = True
-                removed_count += 1
-                break
-        
-        if should_remove:
+        entry, fixes = corrections.fix_entry(entry)
+        if entry is None:
+            removed_count += 1
             continue
-        
-        # Apply name corrections
-        if subject_name in name_corrections:
-            entry['asignatura'] = name_corrections[subject_name]
-            fixed_count += 1
-        
-        # Clean up subject names
-        cleaned_name = subject_name
-        # Remove line breaks
-        cleaned_name = cleaned_name.replace('\n', ' ')
-        # Remove multiple spaces
-        cleaned_name = re.sub(r'\s+', ' ', cleaned_name).strip()
-        
-        # Only update if changed
-        if cleaned_name != subject_name:
-            entry['asignatura'] = cleaned_name
-            fixed_count += 1
-        
-        # Clean professor names
-        if entry.get('profesor'):
-            professor = entry['profesor']
-            for pattern, replacement in professor_cleaning_patterns:
-                professor = re.sub(pattern, replacement, professor)
-            professor = professor.strip()
-            
-            # Remove if professor name is too short or looks like a code
-            if len(professor) < 3 or re.match(r'^[A-Z][0-9]', professor):
-                professor = None
-            
-            entry['profesor'] = professor
-        
-        # Fix classroom codes (remove dots where there shouldn't be)
-        if entry.get('aulas'):
-            fixed_aulas = []
-            for aula in entry['aulas']:
-                # P0.5/0 should be P0.5/0.7
-                if aula == 'P0.5/0':
-                    aula = 'P0.5/0.7'
-                # P0.2/0 should be P0.2/0.4
-                elif aula == 'P0.2/0':
-                    aula = 'P0.2/0.4'
-                fixed_aulas.append(aula)
-            entry['aulas'] = fixed_aulas
-        
-        # Add the fixed entry
+        fixed_count += fixes
         fixed_data.append(entry)
     
     return fixed_data, removed_count, fixed_count
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="Fix known issues in the extracted Excel data")
+    parser.add_argument('--from-store', action='store_true',
+                        help="Read the per-workbook results of the extraction store instead of the JSON export")
+    parser.add_argument('--store', default=DEFAULT_STORE_FILE,
+                        help="SQLite file written by extract-all-excel-schedules.py")
+    args = parser.parse_args()
+    
     print("Loading extracted Excel data...")
     
     # Load data
-    with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-        excel_data = json.load(f)
+    if args.from_store:
+        with ExtractionStore(args.store) as store:
+            excel_data = {'data': store.entries(SOURCE_EXTRACTOR), 'summary': {}}
+        if not excel_data['data']:
+            raise SystemExit(f"No {SOURCE_EXTRACTOR} results in {args.store}; run extract-all-excel-schedules.py first")
+    else:
+        with open(INPUT_FILE, 'r', encoding='utf-8') as f:
+            excel_data = json.load(f)
     
     original_count = len(excel_data['data'])
     print(f"Original entries: {original_count}")
     
     # Fix the data
     print("\nFixing known issues...")
-    fixed_entries, removed_count, fixed_count = fix_extracted_data(excel_data['data'])
+    corrections = ExcelCorrections.load()
+    fixed_entries, removed_count, fixed_count = fix_extracted_data(excel_data['data'], corrections)
     
     # Update the data
     excel_data['data'] = fixed_entries
     excel_data['extraction_date'] = datetime.now().isoformat()
     excel_data['fixed'] = True
+    excel_data['corrections_version'] = corrections.version
     excel_data['fix_summary'] = {
         'original_entries': original_count,
         'removed_entries': removed_count,
@@ -193,11 +122,7 @@ def main():
     print(f"- Fixed entries: {fixed_count}")
     print(f"- Final entries: {len(fixed_entries)}")
     
-    # Show some examples of removed entries
-    print("\nExamples of removed entries:")
-    examples = ["Mireia Carbonell", "Gm2", "Expressió", "Núria Costa", "Pierino dal Pozzo"]
-    for ex in examples[:5]:
-        print(f"  - {ex}")
+    corrections.report()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Indexed fuzzy matching of names against a fixed candidate set.
+Finds the same best SequenceMatcher match as comparing a name with every
+candidate, but normalises and indexes the candidates once and only runs the
+full ratio on the few candidates that can still win.
+"""
+
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+
+def trigrams(s):
+    """Character trigrams of s, padded so that short strings have some"""
+    padded = f"  {s} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def ratio_bound(matches, length):
+    """SequenceMatcher's ratio formula for an upper bound of the matching characters"""
+    return 2.0 * matches / length if length else 1.0
+
+
+class FuzzyMatcher:
+    """Best match of a name among candidates, by SequenceMatcher ratio.
+
+    normalize is applied to the candidates once and to every name looked
+    up. Each candidate keeps a SequenceMatcher with its side already
+    analysed, its length and its character counts, and a character-trigram
+    inverted index points from every trigram to the candidates holding it.
+
+    best_match() first scores the top_k candidates sharing the most
+    trigrams with the name, which usually finds the winner, then skips every
+    other candidate whose length or character-count bound on the ratio
+    cannot beat it. The result is the one of a linear scan that keeps the
+    first candidate with the highest ratio at or above the threshold.
+    """
+
+    def __init__(self, candidates, normalize=None, top_k=8):
+        self.candidates = list(candidates)
+        self.normalize = normalize or (lambda s: s)
+        self.top_k = top_k
+        self.normalized = [self.normalize(candidate) for candidate in self.candidates]
+        self.lengths = [len(s) for s in self.normalized]
+        self.char_counts = [Counter(s) for s in self.normalized]
+        # SequenceMatcher analyses its second sequence; the name is the first
+        self.matchers = [SequenceMatcher(None, '', s) for s in self.normalized]
+        self.index = defaultdict(list)
+        for position, s in enumerate(self.normalized):
+            for gram in trigrams(s):
+                self.index[gram].append(position)
+        self.ratios_computed = 0
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def shortlist(self, query):
+        """Positions of the top_k candidates sharing the most trigrams with a normalised query"""
+        overlap = Counter()
+        for gram in trigrams(query):
+            overlap.update(self.index.get(gram, ()))
+        return [position for position, _ in overlap.most_common(self.top_k)]
+
+    def ratio(self, query, position):
+        """SequenceMatcher(None, query, candidate).ratio() for a normalised query"""
+        matcher = self.matchers[position]
+        matcher.set_seq1(query)
+        self.ratios_computed += 1
+        return matcher.ratio()
+
+    def best_match(self, name, threshold=0.8):
+        """Return (best candidate, ratio), or (None, 0) when none reaches threshold"""
+        query = self.normalize(name)
+        best, best_ratio = None, 0
+
+        def beats(position, ratio):
+            if ratio < threshold:
+                return False
+            return ratio > best_ratio or (best is not None and ratio == best_ratio and position < best)
+
+        scored = set()
+        for position in self.shortlist(query):
+            scored.add(position)
+            ratio = self.ratio(query, position)
+            if beats(position, ratio):
+                best, best_ratio = position, ratio
+
+        query_length = len(query)
+        query_counts = None
+        for position in range(len(self.candidates)):
+            if position in scored:
+                continue
+            length = query_length + self.lengths[position]
+            if not beats(position, ratio_bound(min(query_length, self.lengths[position]), length)):
+                continue
+            if query_counts is None:
+                query_counts = Counter(query)
+            counts = self.char_counts[position]
+            common = sum(min(count, counts[char]) for char, count in query_counts.items())
+            if not beats(position, ratio_bound(common, length)):
+                continue
+            ratio = self.ratio(query, position)
+            if beats(position, ratio):
+                best, best_ratio = position, ratio
+
+        if best is None:
+            return None, 0
+        return self.candidates[best], best_ratio
@@ -1,30 +1,50 @@
 #!/usr/bin/env python3
 """
-Merge all extracted Excel data from different sources into a single comprehensive file.
-Combines GDIS data (from cells) and GBA data (from drawing objects).
+Extract and merge all Excel schedule data into a single comprehensive file.
+Combines GDIS data (from cells) and GBA data (from drawing objects), reading
+each workbook archive once for both.
 """
 
+import argparse
+import importlib.util
 import json
 import os
+import traceback
+import zipfile
 from datetime import datetime
 
-def clean_gba_entries(gba_data):
-    """Clean and fix GBA entries extracted from drawings"""
+import xlsx_fast_reader
+from excel_corrections import ExcelCorrections
+from extraction_store import DEFAULT_STORE_FILE, ExtractionStore
+from shape_text_repair import ShapeTextRepair
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def load_script(filename):
+    """Import one of the hyphen-named extraction scripts as a module"""
+    name = os.path.splitext(filename)[0].replace('-', '_')
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPTS_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+cell_extractor = load_script('extract-all-excel-schedules-v2.py')
+drawing_extractor = load_script('extract-gba-from-drawings-improved.py')
+
+def clean_gba_entries(gba_data, corrections=None, text_repair=None):
+    """Clean and fix GBA entries extracted from drawings
     
-    cleaned = []
+    Shape texts arrive already repaired against the subject dictionary (see
+    shape_text_repair.py); a professor text that spells a whole subject of
+    that dictionary is split out as an entry of its own. The labels to skip
+    come from csv/excel_corrections.json.
+    """
+    if corrections is None:
+        corrections = ExcelCorrections.load()
+    if text_repair is None:
+        text_repair = ShapeTextRepair.shared()
     
-    # Known subject names from the database
-    known_subjects = {
-        "2D, Llenguatges,Tècniquesi Tecnologies": "2D. Llenguatges, Tècniques i Tecnologies",
-        "3D, Llenguatges,Tècniquesi Tecnologies": "3D. Llenguatges, Tècniques i Tecnologies", 
-        "4D, Llenguatges,Tècniquesi Tecnologies": "4D. Llenguatges, Tècniques i Tecnologies",
-        "2D, Llenguatges,Tecniquesi Tecnologies lnstal•lades": "2D. Llenguatges, Tècniques i Tecnologies Instal·lades",
-        "3D, Llenguatges,Tecniquesi Tecnologies lnstal•lades": "3D. Llenguatges, Tècniques i Tecnologies Instal·lades",
-        "4D, Llenguatges,Tecniquesi Tecnologies lnstal•lades": "4D. Llenguatges, Tècniques i Tecnologies Instal·lades",
-        "Laboratori de Processosi Projectes 11": "Laboratori de Processos i Projectes II",
-        "Laboratori de Processosi Projectes VI": "Laboratori de Processos i Projectes VI",
-        "Pensament Contemporani i Practiques Artístiques": "Pensament Contemporani i Pràctiques Crítiques"
-    }
+    cleaned = []
     
     # Process each entry
     seen_subjects = set()
@@ -33,26 +53,16 @@ def clean_gba_entries(gba_data):
         subject = entry['asignatura']
         
         # Skip obvious non-subjects
-        if subject in ['Optativitat', 'tutories', 'Tutories'] or len(subject) < 5:
+        if corrections.is_gba_non_subject(subject):
             continue
         
-        # Clean up subject name
-        if subject in known_subjects:
-            subject = known_subjects[subject]
-        else:
-            # Fix spacing issues
-            subject = subject.replace('Tècniquesi', 'Tècniques i')
-            subject = subject.replace('Tecniquesi', 'Tècniques i')
-            subject = subject.replace('Processosi', 'Processos i')
-            subject = subject.replace('lnstal•lades', 'Instal·lades')
-            subject = subject.replace('Practiques', 'Pràctiques')
-        
         # Check if professor field contains another subject name
         professor = entry.get('profesor', '')
-        if professor and professor in known_subjects:
+        professor_subject = text_repair.subject(professor) if professor else None
+        if professor_subject:
             # This is another subject, not a professor
             cleaned.append({
-                'asignatura': known_subjects[professor],
+                'asignatura': professor_subject,
                 'grado': entry['grado'],
                 'grado_code': entry['grado_code'],
                 'curso': entry['curso'],
@@ -80,42 +90,122 @@ def clean_gba_entries(gba_data):
                 'itinerari': None,
                 'grupo': 'M1' if entry['curso'] else 'Unknown',
                 'aulas': entry.get('aulas', []),
-                'profesor': None if professor in known_subjects else professor,
+                'profesor': None if professor_subject else professor,
                 'es_placeholder': False,
                 'archivo': entry['archivo']
             })
     
     return cleaned
 
+def has_drawings(filename):
+    """GBA timetables live in drawing shapes, except the optatives sheet"""
+    file_info = cell_extractor.parse_filename(filename)
+    return file_info.get('grado_code') == 'GBA' and 'Optativitat' not in filename
+
+def extract_workbook(file_path, store=None):
+    """Extract the cell and drawing entries of one workbook.
+    
+    The archive is opened once: the cell streams of every visible sheet and
+    the drawing shapes are all read from the same ZipFile. Results already in
+    the store (written by this script or by the extractors themselves) are
+    reused, and the archive is not opened at all when both are there.
+    Returns (cell_entries, drawing_entries).
+    """
+    filename = os.path.basename(file_path)
+    file_info = cell_extractor.parse_filename(filename)
+    
+    cell_entries = drawing_entries = None
+    if not has_drawings(filename):
+        drawing_entries = []
+    if store:
+        source_hash = store.source_hash(file_path)
+        cell_entries = store.get(source_hash, filename, cell_extractor.EXTRACTOR_NAME,
+                                 cell_extractor.EXTRACTOR_VERSION)
+        if drawing_entries is None:
+            drawing_entries = store.get(source_hash, filename, drawing_extractor.EXTRACTOR_NAME,
+                                        drawing_extractor.EXTRACTOR_VERSION)
+    if cell_entries is not None and drawing_entries is not None:
+        return cell_entries, drawing_entries
+    
+    with zipfile.ZipFile(file_path) as zip_file:
+        if cell_entries is None:
+            sheets = xlsx_fast_reader.iter_zip_sheets(zip_file)
+            cell_entries = cell_extractor.extract_schedule_data(file_path, file_info, sheets=sheets)
+            if store:
+                store.put(source_hash, cell_extractor.EXTRACTOR_NAME, cell_extractor.EXTRACTOR_VERSION,
+                          filename, cell_entries)
+        
+        if drawing_entries is None:
+            shapes = drawing_extractor.extract_shapes_from_zip(zip_file)
+            drawing_entries = drawing_extractor.deduplicate_entries(
+                drawing_extractor.extract_schedule_from_shapes(shapes, filename))
+            if store:
+                store.put(source_hash, drawing_extractor.EXTRACTOR_NAME, drawing_extractor.EXTRACTOR_VERSION,
+                          filename, drawing_entries)
+    
+    return cell_entries, drawing_entries
+
 def main():
-    """Merge all Excel data sources"""
+    """Extract and merge all Excel data sources"""
+    parser = argparse.ArgumentParser(description="Extract and merge the Excel schedule data")
+    parser.add_argument('--apply-corrections', action='store_true',
+                        help="Also apply the csv/excel_corrections.json fixes to the cell entries")
+    parser.add_argument('--store', default=DEFAULT_STORE_FILE,
+                        help="SQLite file keeping the per-workbook results between runs")
+    parser.add_argument('--no-store', action='store_true',
+                        help="Extract every workbook without reading or writing the store")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Discard the stored cell and drawing results and extract every workbook again")
+    args = parser.parse_args()
+    
+    corrections = ExcelCorrections.load()
+    store = None if args.no_store else ExtractionStore(args.store)
+    if store and args.rebuild:
+        store.clear(cell_extractor.EXTRACTOR_NAME)
+        store.clear(drawing_extractor.EXTRACTOR_NAME)
     
     # File paths
-    gdis_file = '/Users/josepmarimon/Documents/github/bau-assist/csv/extracted_excel_data_v2.json'
-    gba_file = '/Users/josepmarimon/Documents/github/bau-assist/csv/extracted_gba_schedules.json'
-    gba_optatives_file = '/Users/josepmarimon/Documents/github/bau-assist/csv/extracted_excel_data_v2.json'  # Already includes optatives
+    excel_dir = cell_extractor.EXCEL_DIR
     output_file = '/Users/josepmarimon/Documents/github/bau-assist/csv/all_excel_schedules_merged.json'
     
-    all_data = []
+    cell_data = []
+    drawing_data = []
+    errors = []
+    cell_sources = []
+    drawing_sources = []
     
-    print("Merging all Excel schedule data...")
+    print("Extracting and merging all Excel schedule data...")
     print("=" * 80)
     
-    # Load GDIS data (includes GBA optatives)
-    if os.path.exists(gdis_file):
-        with open(gdis_file, 'r', encoding='utf-8') as f:
-            gdis_data = json.load(f)
-            gdis_entries = gdis_data['data']
-            print(f"Loaded {len(gdis_entries)} entries from GDIS extraction (includes optatives)")
-            all_data.extend(gdis_entries)
-    
-    # Load GBA data from drawings
-    if os.path.exists(gba_file):
-        with open(gba_file, 'r', encoding='utf-8') as f:
-            gba_data = json.load(f)
-            gba_entries = clean_gba_entries(gba_data['data'])
-            print(f"Loaded and cleaned {len(gba_entries)} entries from GBA drawings")
-            all_data.extend(gba_entries)
+    for filename in sorted(os.listdir(excel_dir)):
+        if not filename.endswith('.xlsx') or filename.startswith('~'):
+            continue
+        
+        file_path = os.path.join(excel_dir, filename)
+        if store:
+            cell_sources.append((store.source_hash(file_path), filename))
+            if has_drawings(filename):
+                drawing_sources.append(cell_sources[-1])
+        
+        try:
+            cell_entries, drawing_entries = extract_workbook(file_path, store)
+        except Exception:
+            error = traceback.format_exc()
+            print(f"{filename}: ERROR {error.strip().splitlines()[-1]}")
+            errors.append({'file': filename, 'error': error})
+            continue
+        
+        print(f"{filename}: {len(cell_entries)} cell entries, {len(drawing_entries)} drawing entries")
+        if args.apply_corrections:
+            cell_entries = corrections.apply(cell_entries)
+        cell_data.extend(cell_entries)
+        drawing_data.extend(drawing_entries)
+    
+    # Cell entries (GDIS and GBA optatives) first, so they win over drawings
+    gba_entries = clean_gba_entries(drawing_data, corrections)
+    print(f"\nExtracted {len(cell_data)} entries from cells (includes optatives)")
+    print(f"Extracted and cleaned {len(gba_entries)} entries from GBA drawings")
+    all_data = cell_data + gba_entries
     
     # Remove duplicates
     unique_entries = {}
@@ -161,7 +251,9 @@ def main():
         'extraction_date': datetime.now().isoformat(),
         'version': 'merged_final',
         'sources': ['GDIS cells', 'GBA drawings', 'GBA optatives'],
+        'corrections_version': corrections.version,
         'summary': summary,
+        'errors': errors,
         'data': all_data
     }
     
@@ -190,6 +282,14 @@ def main():
     print(f"With classroom assigned: {summary['with_classroom']}")
     
     print(f"\nData saved to: {output_file}")
+    if store:
+        pruned = (store.prune(cell_extractor.EXTRACTOR_NAME, cell_extractor.EXTRACTOR_VERSION, cell_sources)
+                  + store.prune(drawing_extractor.EXTRACTOR_NAME, drawing_extractor.EXTRACTOR_VERSION,
+                                drawing_sources))
+        print(f"Extraction store: {store.hits} results reused, {store.misses} extracted, "
+              f"{pruned} stale results dropped ({args.store})")
+        store.close()
+    corrections.report()
     
     # Show GBA subjects
     gba_subjects = [e for e in all_data if e['grado_code'] == 'GBA']
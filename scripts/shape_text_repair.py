@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Dictionary-driven repair of the text of GBA drawing shapes.
+Shape texts arrive with words glued across text runs ('Tècniquesi'), missing
+accents, misread characters ('lnstal•lades', 'Projectes 11') and no space
+after commas. Instead of blind regex splits, every split, join and
+substitution is decided by looking the words up in a dictionary built from
+the subject names of csv/subjects_correct_from_db.json, and every raw text is
+repaired once per process.
+"""
+
+import json
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+DEFAULT_SUBJECTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                     '..', 'csv', 'subjects_correct_from_db.json')
+
+# Characters normalised before tokenising: bullet read for the Catalan
+# middle dot (l·l), typographic apostrophe, non-breaking space
+CHARACTER_FIXES = str.maketrans({'\u2022': '\u00b7', '\u2019': "'", '\u00a0': ' '})
+
+# Letters (l·l kept inside the word), digit runs, any other character
+TOKEN_PATTERN = re.compile(r"([^\W\d_]+(?:·[^\W\d_]+)*)|(\d+)|(\S)")
+WORD_PATTERN = re.compile(r"[^\W\d_]+(?:·[^\W\d_]+)*")
+ROMAN_NUMERALS = {'i', 'ii', 'iii', 'iv', 'v', 'vi'}
+
+# Splits must leave at least one dictionary word of this length, so short
+# names are not cut into particles; stems of this length validate misreads
+MIN_SPLIT_WORD = 4
+STEM_LENGTH = 6
+
+
+def fold(word):
+    """Lowercase word without accents, the dictionary key"""
+    decomposed = unicodedata.normalize('NFD', word.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def camel_parts(word):
+    """Split word before every capital that follows a lowercase letter"""
+    parts = []
+    start = 0
+    for index in range(1, len(word)):
+        if word[index].isupper() and word[index - 1].islower():
+            parts.append(word[start:index])
+            start = index
+    parts.append(word[start:])
+    return parts
+
+
+def match_case(raw, word):
+    """word with the capitalisation of raw (all caps, capitalised or lowercase)"""
+    if len(raw) > 1 and raw.isupper():
+        return word.upper()
+    if raw[:1].isupper():
+        return word[:1].upper() + word[1:]
+    return word
+
+
+class ShapeTextRepair:
+    """Memoised repair of drawing shape texts against a word dictionary.
+
+    words maps the folded form of every subject-name word to its spelling;
+    numbered holds the words followed by a roman numeral in some subject
+    name, and subjects maps every folded subject name to its spelling. cache keeps the repaired text of every raw text seen, and hits and
+    misses count the repair() calls answered from it or computed.
+    """
+
+    _shared = None
+
+    def __init__(self, names):
+        spellings = defaultdict(Counter)
+        self.numbered = set()
+        self.subjects = {}
+        for name in names:
+            self.subjects.setdefault(fold(' '.join(name.translate(CHARACTER_FIXES).split())), name)
+            previous = None
+            for word, _, _ in TOKEN_PATTERN.findall(name.translate(CHARACTER_FIXES)):
+                if not word:
+                    previous = None
+                    continue
+                key = fold(word)
+                spellings[key][word.lower()] += 1
+                if previous is not None and key in ROMAN_NUMERALS:
+                    self.numbered.add(previous)
+                previous = key
+        self.words = {key: counts.most_common(1)[0][0] for key, counts in spellings.items()}
+        self.stems = {key[:STEM_LENGTH] for key in self.words if len(key) >= STEM_LENGTH}
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path=DEFAULT_SUBJECTS_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            subjects = json.load(f)
+        return cls(subject['nom_ca'] for subject in subjects if subject.get('nom_ca'))
+
+    @classmethod
+    def shared(cls):
+        """Instance over the default dictionary, loaded once so its cache spans workbooks"""
+        if cls._shared is None:
+            cls._shared = cls.load()
+        return cls._shared
+
+    def repair(self, text):
+        """Repaired text of a raw shape text, with single spaces and no surrounding blanks"""
+        repaired = self.cache.get(text)
+        if repaired is not None:
+            self.hits += 1
+            return repaired
+        self.misses += 1
+        repaired = self.cache[text] = self._repair(text)
+        return repaired
+
+    def subject(self, text):
+        """Dictionary subject name that text spells, or None"""
+        return self.subjects.get(fold(' '.join(text.translate(CHARACTER_FIXES).split())))
+
+    def is_word(self, word):
+        return fold(word) in self.words
+
+    def _known(self, raw):
+        """Dictionary spelling of raw in its capitalisation, or None"""
+        word = self.words.get(fold(raw))
+        return None if word is None else match_case(raw, word)
+
+    def _fix_word(self, raw):
+        """Repair one letter run: spelling, camelCase and glued words, misreads"""
+        known = self._known(raw)
+        if known is not None:
+            return known
+
+        parts = camel_parts(raw)
+        if len(parts) > 1:
+            return ' '.join(self._fix_word(part) for part in parts)
+
+        key = fold(raw)
+        for cut in range(len(key) - 1, 0, -1):
+            head, tail = key[:cut], key[cut:]
+            if (head in self.words and tail in self.words
+                    and max(len(head), len(tail)) >= MIN_SPLIT_WORD):
+                return f"{self._known(raw[:cut])} {self._known(raw[cut:])}"
+
+        # An l read for a capital I at the start of a word ('lnstal·lades')
+        if len(raw) > 2 and raw[0] == 'l' and raw[1] not in 'aeiouàèéíòóúl':
+            variant = 'I' + raw[1:]
+            known = self._known(variant)
+            if known is not None:
+                return known
+            if fold(variant)[:STEM_LENGTH] in self.stems and key[:STEM_LENGTH] not in self.stems:
+                return variant
+        return raw
+
+    def _follows_word(self, tokens, index):
+        """True when the token before index is a dictionary word of 3+ letters"""
+        word = tokens[index - 1][0] if index else ''
+        return len(word) >= 3 and self.is_word(word)
+
+    def _fix_chunk(self, chunk):
+        """Repair one whitespace-free chunk; returns (text, key of its last word)"""
+        tokens = TOKEN_PATTERN.findall(chunk)
+        pieces = []
+        last_word = None
+        for index, (word, digits, other) in enumerate(tokens):
+            if word:
+                # Split from a number only when the letters are a real word ('11Tipografia')
+                if index and tokens[index - 1][1] and len(word) >= 3 and self.is_word(word):
+                    pieces.append(' ')
+                fixed = self._fix_word(word)
+                pieces.append(fixed)
+                last_word = fold(fixed.rsplit(' ', 1)[-1])
+            elif digits:
+                if self._follows_word(tokens, index):
+                    pieces.append(' ')
+                pieces.append(digits)
+            else:
+                pieces.append(other)
+                if other in ',;' and index + 1 < len(tokens) and tokens[index + 1][0]:
+                    pieces.append(' ')
+        return ''.join(pieces), last_word
+
+    def _repair(self, text):
+        chunks = text.translate(CHARACTER_FIXES).split()
+        words = []
+        previous_word = None
+        index = 0
+        while index < len(chunks):
+            chunk = chunks[index]
+            index += 1
+            # Rejoin a word split in two, when neither half is a word by itself
+            if index < len(chunks):
+                joined = chunk + chunks[index]
+                if (WORD_PATTERN.fullmatch(joined) and self.is_word(joined)
+                        and not self.is_word(chunk) and not self.is_word(chunks[index])):
+                    chunk = joined
+                    index += 1
+
+            # Roman numerals read as ones ('Projectes 11')
+            if set(chunk) == {'1'} and len(chunk) <= 3 and previous_word in self.numbered:
+                words.append('I' * len(chunk))
+                previous_word = None
+                continue
+
+            fixed, previous_word = self._fix_chunk(chunk)
+            words.append(fixed)
+        return ' '.join(words)
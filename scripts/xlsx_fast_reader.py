@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Lightweight .xlsx cell reader for the Excel timetable extractors.
+Streams the shared strings, the fills of the stylesheet and one worksheet
+straight out of the zip with iterparse, without building openpyxl's workbook,
+cell and style objects. Values are cast the way openpyxl does with
+data_only=True, so the extractors see the same values either way.
+"""
+
+import math
+import posixpath
+import zipfile
+from bisect import bisect_right
+import xml.etree.ElementTree as ET
+
+from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+
+MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+# Same colours as is_white_background(); openpyxl prefixes 6-digit rgb with 00
+WHITE_RGB = {'FFFFFFFF', '00FFFFFF'}
+
+# Drawing coordinates are in EMU; column widths are converted to pixels with
+# the maximum digit width of Calibri 11, the default font of the workbooks
+EMU_PER_PIXEL = 9525
+MAX_DIGIT_WIDTH = 7
+DEFAULT_BASE_COL_WIDTH = 8
+DEFAULT_ROW_HEIGHT = 15
+
+
+def read_shared_strings(zip_file):
+    """Return the shared string table as a list of plain strings."""
+    if 'xl/sharedStrings.xml' not in zip_file.namelist():
+        return []
+
+    strings = []
+    with zip_file.open('xl/sharedStrings.xml') as source:
+        for _, element in ET.iterparse(source):
+            if element.tag == MAIN_NS + 'si':
+                # Plain <t> plus the <t> of every rich-text run; phonetic runs are skipped
+                parts = [element.findtext(MAIN_NS + 't')]
+                parts.extend(run.findtext(MAIN_NS + 't') for run in element.iterfind(MAIN_NS + 'r'))
+                strings.append(''.join(part for part in parts if part is not None).replace('x005F_', ''))
+                element.clear()
+    return strings
+
+
+def read_cell_styles(zip_file):
+    """Return (white_styles, date_styles, timedelta_styles) as sets of cellXfs indexes.
+
+    white_styles are the styles whose fill is solid white, the marker of
+    placeholder subjects; the other two tell which numbers are dates/durations.
+    """
+    white_styles, date_styles, timedelta_styles = set(), set(), set()
+    if 'xl/styles.xml' not in zip_file.namelist():
+        return white_styles, date_styles, timedelta_styles
+
+    custom_formats = {}
+    white_fills = []
+    cell_xfs = []
+    section = None
+    with zip_file.open('xl/styles.xml') as source:
+        for event, element in ET.iterparse(source, events=('start', 'end')):
+            tag = element.tag
+            if event == 'start':
+                if tag in (MAIN_NS + 'fills', MAIN_NS + 'cellXfs', MAIN_NS + 'cellStyleXfs'):
+                    section = tag
+                continue
+
+            if tag == MAIN_NS + 'numFmt':
+                custom_formats[int(element.get('numFmtId'))] = element.get('formatCode')
+            elif tag == MAIN_NS + 'fill' and section == MAIN_NS + 'fills':
+                pattern = element.find(MAIN_NS + 'patternFill')
+                color = pattern.find(MAIN_NS + 'fgColor') if pattern is not None else None
+                rgb = color.get('rgb') if color is not None else None
+                if rgb is not None and len(rgb) == 6:
+                    rgb = '00' + rgb
+                white_fills.append(pattern is not None and pattern.get('patternType') == 'solid'
+                                   and rgb in WHITE_RGB)
+                element.clear()
+            elif tag == MAIN_NS + 'xf' and section == MAIN_NS + 'cellXfs':
+                cell_xfs.append((int(element.get('fillId', 0)), int(element.get('numFmtId', 0))))
+                element.clear()
+            elif tag in (MAIN_NS + 'fills', MAIN_NS + 'cellXfs', MAIN_NS + 'cellStyleXfs'):
+                section = None
+
+    for index, (fill_id, num_fmt_id) in enumerate(cell_xfs):
+        if fill_id < len(white_fills) and white_fills[fill_id]:
+            white_styles.add(index)
+        number_format = custom_formats.get(num_fmt_id) or builtin_format_code(num_fmt_id)
+        if number_format and is_date_format(number_format):
+            date_styles.add(index)
+        if number_format and is_timedelta_format(number_format):
+            timedelta_styles.add(index)
+    return white_styles, date_styles, timedelta_styles
+
+
+def read_workbook(zip_file):
+    """Return (sheets, active_index, epoch) from xl/workbook.xml.
+
+    sheets is a list of (name, path in the zip, state, is_worksheet) in
+    workbook order, where state is 'visible', 'hidden' or 'veryHidden' and
+    is_worksheet is False for chartsheets; the active sheet is the one
+    openpyxl's wb.active returns.
+    """
+    targets = {}
+    with zip_file.open('xl/_rels/workbook.xml.rels') as source:
+        for rel in ET.parse(source).getroot().iter(PKG_REL_NS + 'Relationship'):
+            target = rel.get('Target')
+            path = (target.lstrip('/') if target.startswith('/')
+                    else posixpath.normpath(posixpath.join('xl', target)))
+            targets[rel.get('Id')] = (path, rel.get('Type', '').endswith('/worksheet'))
+
+    with zip_file.open('xl/workbook.xml') as source:
+        root = ET.parse(source).getroot()
+
+    sheets = []
+    for sheet in root.iter(MAIN_NS + 'sheet'):
+        path, is_worksheet = targets[sheet.get(REL_NS + 'id')]
+        sheets.append((sheet.get('name'), path, sheet.get('state', 'visible'), is_worksheet))
+    active = 0
+    for view in root.iter(MAIN_NS + 'workbookView'):
+        if view.get('activeTab') is not None:
+            active = int(view.get('activeTab'))
+            break
+    properties = root.find(MAIN_NS + 'workbookPr')
+    date1904 = properties is not None and properties.get('date1904') in ('1', 'true')
+    return sheets, active, CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+
+
+def relationship_target(part_path, target):
+    """Resolve a relationship Target against the part whose .rels file declares it."""
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join(posixpath.dirname(part_path), target))
+
+
+def read_part_relationships(zip_file, part_path):
+    """Return [(type, path in the zip)] of the internal relationships of a part.
+
+    type is the last segment of the relationship type URI, e.g. 'drawing'.
+    Parts without a .rels file have no relationships.
+    """
+    rels_path = posixpath.join(posixpath.dirname(part_path), '_rels', posixpath.basename(part_path) + '.rels')
+    if rels_path not in zip_file.namelist():
+        return []
+
+    with zip_file.open(rels_path) as source:
+        root = ET.parse(source).getroot()
+    return [(rel.get('Type', '').rsplit('/', 1)[-1], relationship_target(part_path, rel.get('Target')))
+            for rel in root.iter(PKG_REL_NS + 'Relationship')
+            if rel.get('TargetMode') != 'External']
+
+
+def iter_zip_drawings(zip_file):
+    """Yield (sheet name, sheet path, drawing path) for the drawings of every visible worksheet.
+
+    Drawings are found through each sheet's relationships, in workbook order,
+    so they are attributed to the right sheet whatever their file names.
+    """
+    sheets, _, _ = read_workbook(zip_file)
+    for name, sheet_path, state, is_worksheet in sheets:
+        if not (is_worksheet and state == 'visible'):
+            continue
+        for rel_type, path in read_part_relationships(zip_file, sheet_path):
+            if rel_type == 'drawing' and path in zip_file.namelist():
+                yield name, sheet_path, path
+
+
+def column_width_pixels(width):
+    """Pixel width of a column whose width attribute (in characters) is width."""
+    return math.trunc((256 * width + math.trunc(128 / MAX_DIGIT_WIDTH)) / 256 * MAX_DIGIT_WIDTH)
+
+
+def row_height_pixels(height):
+    """Pixel height of a row height in points (96 dpi)."""
+    return round(height * 96 / 72)
+
+
+class SheetGeometry:
+    """Column and row edges of a worksheet in EMU, the unit of drawing coordinates.
+
+    Indexes are 0-based like drawing anchors. Only the edges up to the last
+    column or row with its own size are stored; past them every column or
+    row has the default size, so any position maps to a cell without a list
+    the size of the sheet.
+    """
+
+    def __init__(self, col_sizes, row_sizes, default_col_size, default_row_size):
+        self.default_col_size = default_col_size
+        self.default_row_size = default_row_size
+        self.col_edges = self._edges(col_sizes, default_col_size)
+        self.row_edges = self._edges(row_sizes, default_row_size)
+
+    @staticmethod
+    def _edges(sizes, default):
+        edges = [0]
+        for index in range(max(sizes, default=-1) + 1):
+            edges.append(edges[-1] + sizes.get(index, default))
+        return edges
+
+    @staticmethod
+    def _edge(edges, default, index):
+        if index < len(edges):
+            return edges[index]
+        return edges[-1] + (index - len(edges) + 1) * default
+
+    @staticmethod
+    def _index_at(edges, default, position):
+        if position < edges[-1]:
+            return max(bisect_right(edges, position) - 1, 0)
+        return len(edges) - 1 + int(position - edges[-1]) // default if default else len(edges) - 1
+
+    def col_x(self, col):
+        """EMU offset of the left edge of col."""
+        return self._edge(self.col_edges, self.default_col_size, col)
+
+    def row_y(self, row):
+        """EMU offset of the top edge of row."""
+        return self._edge(self.row_edges, self.default_row_size, row)
+
+    def col_at(self, x):
+        """Column holding the EMU offset x; a column's left edge belongs to it."""
+        return self._index_at(self.col_edges, self.default_col_size, x)
+
+    def row_at(self, y):
+        """Row holding the EMU offset y; a row's top edge belongs to it."""
+        return self._index_at(self.row_edges, self.default_row_size, y)
+
+    def point(self, col, col_offset, row, row_offset):
+        """(x, y) in EMU of a drawing anchor marker."""
+        return self.col_x(col) + col_offset, self.row_y(row) + row_offset
+
+
+def read_sheet_geometry(zip_file, sheet_path):
+    """Read the column widths and row heights of a worksheet into a SheetGeometry.
+
+    Hidden columns and rows are zero-sized. Rows are cleared as they are
+    parsed, so the sheet is streamed like read_sheet_cells() does.
+    """
+    base_col_width = DEFAULT_BASE_COL_WIDTH
+    default_col_width = None
+    default_row_height = DEFAULT_ROW_HEIGHT
+    col_sizes = {}
+    row_sizes = {}
+
+    format_tag, col_tag, row_tag = MAIN_NS + 'sheetFormatPr', MAIN_NS + 'col', MAIN_NS + 'row'
+    row = 0
+    with zip_file.open(sheet_path) as source:
+        for _, element in ET.iterparse(source):
+            tag = element.tag
+            if tag == row_tag:
+                row = int(element.get('r') or row + 1)
+                if element.get('hidden') in ('1', 'true'):
+                    row_sizes[row - 1] = 0
+                elif element.get('ht') is not None:
+                    row_sizes[row - 1] = row_height_pixels(float(element.get('ht'))) * EMU_PER_PIXEL
+                element.clear()
+            elif tag == col_tag:
+                if element.get('hidden') in ('1', 'true'):
+                    size = 0
+                elif element.get('width') is not None:
+                    size = column_width_pixels(float(element.get('width'))) * EMU_PER_PIXEL
+                else:
+                    continue
+                for col in range(int(element.get('min')) - 1, int(element.get('max'))):
+                    col_sizes[col] = size
+            elif tag == format_tag:
+                base_col_width = int(element.get('baseColWidth', base_col_width))
+                if element.get('defaultColWidth') is not None:
+                    default_col_width = float(element.get('defaultColWidth'))
+                default_row_height = float(element.get('defaultRowHeight', default_row_height))
+
+    if default_col_width is not None:
+        default_col_pixels = column_width_pixels(default_col_width)
+    else:
+        # baseColWidth digits plus 5 pixels of padding, rounded up to 8 pixels
+        default_col_pixels = math.ceil((base_col_width * MAX_DIGIT_WIDTH + 5) / 8) * 8
+    # <cols> ranges may run to the last column of the sheet; keep only the sizes that differ
+    default_col_size = default_col_pixels * EMU_PER_PIXEL
+    default_row_size = row_height_pixels(default_row_height) * EMU_PER_PIXEL
+    col_sizes = {col: size for col, size in col_sizes.items() if size != default_col_size}
+    row_sizes = {row: size for row, size in row_sizes.items() if size != default_row_size}
+    return SheetGeometry(col_sizes, row_sizes, default_col_size, default_row_size)
+
+
+def column_index(coordinate):
+    """'AB12' -> 28."""
+    col = 0
+    for char in coordinate:
+        if char <= '9':
+            break
+        col = col * 26 + ord(char) - 64
+    return col
+
+
+def iter_cells(file_path, sheet_path=None):
+    """Yield (row, col, value, is_white_fill) for every cell with a value, row by row.
+
+    Reads the active sheet unless sheet_path (e.g. 'xl/worksheets/sheet1.xml')
+    is given.
+    """
+    with zipfile.ZipFile(file_path) as zip_file:
+        yield from iter_zip_cells(zip_file, sheet_path)
+
+
+def iter_zip_cells(zip_file, sheet_path=None):
+    """iter_cells() over an already open ZipFile, e.g. to share it with the drawings reader."""
+    sheets, active, epoch = read_workbook(zip_file)
+    if sheet_path is None:
+        sheet_path = sheets[active][1]
+    yield from read_sheet_cells(zip_file, sheet_path, read_shared_strings(zip_file),
+                                read_cell_styles(zip_file), epoch)
+
+
+def iter_sheets(file_path):
+    """Yield (sheet name, cells) for every visible worksheet, in workbook order.
+
+    cells is an iter_cells()-like stream; consume it before asking for the
+    next sheet.
+    """
+    with zipfile.ZipFile(file_path) as zip_file:
+        yield from iter_zip_sheets(zip_file)
+
+
+def iter_zip_sheets(zip_file):
+    """iter_sheets() over an already open ZipFile.
+
+    The shared strings and the stylesheet are read once for all the sheets.
+    """
+    sheets, _, epoch = read_workbook(zip_file)
+    shared_strings = read_shared_strings(zip_file)
+    styles = read_cell_styles(zip_file)
+    for name, sheet_path, state, is_worksheet in sheets:
+        if is_worksheet and state == 'visible':
+            yield name, read_sheet_cells(zip_file, sheet_path, shared_strings, styles, epoch)
+
+
+def read_sheet_cells(zip_file, sheet_path, shared_strings, styles, epoch):
+    """Stream the cells of one worksheet given the workbook-wide tables.
+
+    styles is the read_cell_styles() triple. Each row is cleared as soon as
+    its cells are yielded, so only empty row stubs stay in memory whatever
+    the size of the sheet.
+    """
+    white_styles, date_styles, timedelta_styles = styles
+
+    row_tag, cell_tag = MAIN_NS + 'row', MAIN_NS + 'c'
+    value_tag, inline_tag, text_tag = MAIN_NS + 'v', MAIN_NS + 'is', MAIN_NS + 't'
+    row = 0
+    with zip_file.open(sheet_path) as source:
+        for _, element in ET.iterparse(source):
+            if element.tag != row_tag:
+                continue
+
+            row = int(element.get('r') or row + 1)
+            col = 0
+            for cell in element:
+                if cell.tag != cell_tag:
+                    continue
+                coordinate = cell.get('r')
+                col = column_index(coordinate) if coordinate else col + 1
+                data_type = cell.get('t', 'n')
+                style = cell.get('s')
+                style = int(style) if style else 0
+
+                if data_type == 'inlineStr':
+                    inline = cell.find(inline_tag)
+                    if inline is None:
+                        continue
+                    parts = [inline.findtext(text_tag)]
+                    parts.extend(run.findtext(text_tag) for run in inline.iterfind(MAIN_NS + 'r'))
+                    value = ''.join(part for part in parts if part is not None)
+                else:
+                    value = cell.findtext(value_tag)
+                    if not value:
+                        continue
+                    if data_type == 's':
+                        value = shared_strings[int(value)]
+                    elif data_type == 'n':
+                        value = float(value) if ('.' in value or 'E' in value or 'e' in value) else int(value)
+                        if style in date_styles:
+                            try:
+                                value = from_excel(value, epoch, timedelta=style in timedelta_styles)
+                            except (OverflowError, ValueError):
+                                value = '#VALUE!'
+                    elif data_type == 'b':
+                        value = bool(int(value))
+                    elif data_type == 'd':
+                        value = from_ISO8601(value)
+
+                yield row, col, value, style in white_styles
+
+            element.clear()